@@ -1,3 +1,4 @@
+import os
 import sys
 from pathlib import Path
 
@@ -45,9 +46,36 @@ NVENC_RC = 'vbr_hq'
 NVENC_LOOKAHEAD = '32'
 NVENC_AQ = '1'  # 0 = выкл, 1 = вкл
 NVENC_AQ_STRENGTH = '15'  # 1-15 (для AQ=1)
+# Лимит одновременных сессий NVENC в драйвере. Для потребительских карт
+# (GeForce, TITAN) драйвер ограничивает число сессий (актуальные драйверы -
+# до 8), у профессиональных (RTX Ada, RTX A, L4/L40, H100, Quadro, Tesla)
+# ограничения нет - для них берем разумный верхний предел.
+# Лимит задает значение по умолчанию, пользователь может его превысить.
+NVENC_DEFAULT_MAX_SESSIONS = 2  # Если модель GPU определить не удалось
+NVENC_CONSUMER_MAX_SESSIONS = 8
+NVENC_PRO_MAX_SESSIONS = 8
 
 SUBTITLE_TRACK_TITLE_KEYWORD = "Надписи"
 FONTS_SUBDIR = "fonts"  # Относительно APP_DIR
+CACHE_SUBDIR = "cache"  # Относительно APP_DIR
+# Сколько файлов хранить в кэше результатов ffprobe между запусками
+PROBE_CACHE_MAX_ENTRIES = 3000
+# Сколько секунд видео анализирует cropdetect и его порог черного (0-255).
+# Кадры берутся разреженно (ключевые), поэтому окно не сокращаем: на
+# темном начале серии короткое окно дает ложный кроп
+CROP_ANALYSIS_SECONDS = 30
+CROP_LIMIT_VALUE = 24
+# Папка для временных файлов кодирования (субтитры, шрифты, выход на
+# сетевой диск). Переменная окружения TRANSCODE_TEMP позволяет вынести их
+# на быстрый диск; иначе используется системная папка TEMP. /dev/shm по
+# умолчанию не берем: при выводе в сеть там оказался бы весь выходной файл
+TRANSCODE_TEMP_DIR = (
+    Path(os.environ["TRANSCODE_TEMP"]) if os.environ.get("TRANSCODE_TEMP")
+    else None
+)
+# Минимальный уровень сообщений кодировщика в логе GUI:
+# debug, info, warning, error
+ENCODER_LOG_LEVEL = "debug"
 
 
 FFMPEG_EXE_NAME = "ffmpeg.exe"
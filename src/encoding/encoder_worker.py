@@ -1,14 +1,20 @@
+from collections import deque
 from pathlib import Path
+import os
+import re
 import subprocess
-import platform
 import tempfile
 import shutil
+import signal
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import lru_cache
 import time
 import traceback
 
 from PyQt6.QtCore import (
     QObject, pyqtSignal, QThread, QMetaObject, Qt, Q_RETURN_ARG, Q_ARG,
-    QProcess, pyqtSlot
+    QProcess, QTimer, pyqtSlot
 )
 
 from src.app_config import (
@@ -16,15 +22,213 @@ from src.app_config import (
     NVENC_PRESET, NVENC_TUNING, NVENC_RC, NVENC_LOOKAHEAD,
     NVENC_AQ, NVENC_AQ_STRENGTH, SUBTITLE_TRACK_TITLE_KEYWORD,
     DEFAULT_AUDIO_TRACK_LANGUAGE, LOSSLESS_QP_VALUE,
-    DEFAULT_AUDIO_TRACK_TITLE
+    DEFAULT_AUDIO_TRACK_TITLE, NVENC_DEFAULT_MAX_SESSIONS, ENCODER_LOG_LEVEL,
+    TRANSCODE_TEMP_DIR, CROP_ANALYSIS_SECONDS, CROP_LIMIT_VALUE
 )
 from src.ffmpeg.info import get_video_subtitle_attachment_info
+from src.ffmpeg.probe_cache import (
+    get_cached_crop, get_cached_video_info, save_probe_cache
+)
 from src.ffmpeg.command import build_ffmpeg_command
-from src.ffmpeg.progress import parse_ffmpeg_output_for_progress
-from src.ffmpeg.attachments import extract_attachments
-from src.ffmpeg.subtitles import extract_subtitle_track
+from src.ffmpeg.progress import parse_ffmpeg_progress_block
+from src.ffmpeg.side_data import extract_fonts_and_subtitle
 from src.ffmpeg.crop import get_crop_parameters
-from src.ffmpeg.utils import sanitize_filename_part
+from src.ffmpeg.utils import (
+    CREATIONFLAGS, IS_WINDOWS, is_network_path, sanitize_filename_part
+)
+
+# Строки stderr длиннее этого значения обрезаются: сообщения об ошибках
+# ffmpeg короткие, а длинные строки (метаданные) не нужны
+MAX_STDERR_LINE_LENGTH = 1024
+# Сколько последних строк stderr хранить для анализа ошибки
+STDERR_TAIL_LINES = 500
+# Порядок уровней лога; неизвестные уровни (например, success) считаются info
+LOG_LEVELS = {'debug': 0, 'info': 1, 'warning': 2, 'error': 3}
+# Сколько ffprobe запускать одновременно при подсчете длительности очереди
+PRESCAN_MAX_WORKERS = 8
+# Не чаще одного обновления прогресса в GUI за этот интервал (мс):
+# промежуточные значения заменяются последним
+PROGRESS_EMIT_INTERVAL_MS = 100
+# Файлы больше этого числа пикселей (выше 1080p) кодируются без других
+# файлов параллельно: одна такая сессия уже загружает NVENC и декодер
+PARALLEL_MAX_PIXELS = 1920 * 1080
+# Оценка времени всей очереди пересчитывается не чаще раза в интервал (с)
+QUEUE_ETA_INTERVAL_S = 1.0
+# Шаблон строки статуса; заполняется только при отправке прогресса в GUI
+PROGRESS_STATUS_TEMPLATE = (
+    "{name}{parallel} ({percent}%) | {times} | Скорость: {speed} | "
+    "FPS: {fps} | Битрейт: {bitrate}"
+)
+# Сколько ждать завершения группы ffmpeg после SIGTERM перед SIGKILL (мс)
+KILL_GRACE_MS = 2000
+
+# Регулярные выражения для analyze_ffmpeg_stderr
+_NVENC_DRIVER_RE = re.compile(
+    r'driver for nvenc is (\d+(?:\.\d+){0,2}) or newer'
+)
+_NO_SUCH_FILE_RE = re.compile(
+    r'((?:[A-Za-z]:)?[^:\n]+): No such file or directory'
+)
+_PERM_DENIED_RE = re.compile(r'((?:[A-Za-z]:)?[^:\n]+): Permission denied')
+_ERROR_LINE_RE = re.compile(
+    r'error|failed|invalid|could not|unable|cannot|unrecognized',
+    re.IGNORECASE
+)
+_PROGRESS_LINE_RE = re.compile(r'frame=|fps=|speed=')
+# Пары ключ=значение из вывода -progress, весь блок разбирается одним findall
+_PROGRESS_FIELD_RE = re.compile(r'^([\w.]+)=([^\r\n]*)', re.MULTILINE)
+# Известные ошибки ffmpeg в порядке приоритета при диагнозе.
+# Объединены в одно выражение, чтобы stderr просматривался за один проход
+_ERROR_PATTERNS = (
+    ('nvenc_driver', r'Driver does not support the required nvenc API version'),
+    # Строка с требуемой версией драйвера, ее разбирает _NVENC_DRIVER_RE
+    ('nvenc_driver_version', r'The minimum required Nvidia driver for nvenc'),
+    ('no_space', r'No space left on device'),
+    ('libass', r'\[libass\]|fontconfig'),
+    ('font_not_found', r'Font not found'),
+    ('no_such_file', r'No such file or directory'),
+    ('permission_denied', r'Permission denied'),
+    ('unknown_option', r'Unrecognized option|Option not found'),
+    ('invalid_argument', r'Invalid argument'),
+    ('no_output', r'At least one output file must be specified'),
+    ('filters', r'Error initializing filters'),
+    ('moov', r'moov atom not found'),
+    ('conversion_failed', r'Conversion failed'),
+)
+_ERROR_UNION_RE = re.compile(
+    '|'.join(f'(?P<{name}>{pattern})' for name, pattern in _ERROR_PATTERNS),
+    re.IGNORECASE
+)
+# stderr хранится в байтах и декодируется только при разборе ошибки;
+# шаблоны ошибок ASCII, поэтому ищутся прямо в байтах
+_ERROR_UNION_BYTES_RE = re.compile(
+    _ERROR_UNION_RE.pattern.encode('ascii'), re.IGNORECASE
+)
+# Ошибки, для которых достаточно фиксированного сообщения
+_SIMPLE_ERROR_MESSAGES = {
+    'unknown_option': "Неизвестная опция FFmpeg (возможно, опечатка в коде команды).",
+    'invalid_argument': "Неверный аргумент команды FFmpeg (Invalid argument).",
+    'no_output': "Не указан выходной файл (внутренняя ошибка сборки команды).",
+    'filters': "Ошибка инициализации фильтров (возможно, неверные параметры кропа или разрешения).",
+    'moov': "Поврежденный входной файл (moov atom not found).",
+    'conversion_failed': "Конвертация не удалась (Conversion failed).",
+}
+
+
+def link_or_copy(source: Path, target: Path):
+    """Создает жесткую ссылку на файл, а если это невозможно - копию."""
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copy2(source, target)
+
+
+@lru_cache(maxsize=128)
+def plan_scale_target(
+    target_width: int, target_height: int,
+    cropped_width: int | None = None, cropped_height: int | None = None
+) -> tuple[int, int]:
+    """
+    Возвращает итоговое разрешение масштабирования. После кропа ширина
+    считается по пропорциям обрезанного кадра. Результат зависит только от
+    размеров, поэтому кэшируется для файлов очереди с одинаковой геометрией.
+    """
+    if not (cropped_width and cropped_height):
+        return target_width, target_height
+    # Целочисленное деление с округлением, без погрешностей float на x.5
+    num = target_height * cropped_width
+    den = cropped_height
+    # Сбрасываем младший бит: размеры для yuv420 должны быть четными
+    return (num + den // 2) // den & ~1, target_height & ~1
+
+
+def remove_temp_dir(path: Path):
+    """
+    Удаляет временную папку файла. Обычно в ней лишь несколько файлов
+    без вложенных папок, их проще удалить через os.scandir без рекурсивного
+    обхода shutil.rmtree; при вложенных папках используется rmtree.
+    Ошибки игнорируются: остатки удалятся вместе с папкой сессии.
+    """
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    break
+                os.unlink(entry.path)
+            else:
+                os.rmdir(path)
+                return
+    except OSError:
+        pass
+    shutil.rmtree(path, ignore_errors=True)
+
+
+def classify_stderr_line(line: bytes, error_lines: dict):
+    """Запоминает первую строку (в байтах) для каждой известной ошибки."""
+    for match in _ERROR_UNION_BYTES_RE.finditer(line):
+        error_lines.setdefault(match.lastgroup, line)
+
+
+def decode_stderr_lines(lines) -> list[str]:
+    """Декодирует сохраненные строки stderr для анализа и вывода в лог."""
+    return [
+        line.decode('utf-8', errors='replace')
+        if isinstance(line, bytes) else line
+        for line in lines
+    ]
+
+
+def split_chunk_lines(pending, data) -> tuple[list, str | bytes]:
+    """
+    Делит прочитанный блок вывода (str или bytes) на строки. QProcess
+    отдает данные блоками произвольной длины, поэтому неполная последняя
+    строка возвращается отдельно и дописывается к следующему блоку.
+    Для bytes это же не дает разрезать многобайтовый символ UTF-8.
+    """
+    data = pending + data
+    lines = data.splitlines()
+    newline_chars = b'\r\n' if isinstance(data, bytes) else '\r\n'
+    if lines and data[-1:] not in newline_chars:
+        pending = lines.pop()
+    else:
+        pending = data[:0]
+    return [line for line in lines if line], pending
+
+
+class EncodeJob:
+    """Состояние кодирования одного файла очереди."""
+
+    def __init__(self, index: int, input_file: Path):
+        self.index = index
+        self.input_file = input_file
+        # Имя файла нужно в каждом сообщении о прогрессе, вычисляем один раз
+        self.name = input_file.name
+        self.process = None
+        self.output_file = None
+        # Файл, в который пишет ffmpeg: output_file или временный файл,
+        # если вывод идет на сетевой диск
+        self.encode_output = None
+        self.temp_dir = None
+        self.duration = 0
+        self.start_time = None
+        # Файл кодируется без других параллельных заданий
+        self.exclusive = False
+        self.percent = 0
+        # Процент, последним отправленный в список файлов GUI
+        self.reported_percent = None
+        self.speed = 0.0
+        # Хвост stderr (строки в байтах) для анализа ошибки; весь вывод
+        # не храним
+        self.stderr_log = deque(maxlen=STDERR_TAIL_LINES)
+        # Первые строки с известными ошибками (маркер -> строка): хвост
+        # мог их уже вытеснить, а для диагноза они нужны
+        self.error_lines = {}
+        # Незавершенные хвосты строк из последних прочитанных блоков
+        self.stderr_partial = b""
+        self.progress_partial = ""
+        # Текущий блок ключ=значение из вывода -progress
+        self.progress_fields = {}
+        self.holds_nvenc_slot = False
 
 
 class EncoderWorker(QObject):
@@ -33,6 +237,8 @@ class EncoderWorker(QObject):
     file_processed = pyqtSignal(str, bool, str)
     finished = pyqtSignal(bool)
     overall_progress = pyqtSignal(int, int, str)
+    # Прогресс каждого активного файла: (путь к файлу, проценты)
+    file_progress = pyqtSignal(str, int)
 
     def __init__(
         self,
@@ -51,10 +257,16 @@ class EncoderWorker(QObject):
         overwrite_existing: bool,
         audio_settings: dict,
         video_settings: dict,
-        parent_gui: QObject
+        parent_gui: QObject,
+        max_parallel_jobs: int = 1,
+        log_level: str = ENCODER_LOG_LEVEL
     ):
         super().__init__()
+        # Сообщения ниже этого уровня не отправляются в GUI: каждое - это
+        # межпоточный вызов слота
+        self._log_min = LOG_LEVELS.get(log_level, LOG_LEVELS['info'])
         self.files_to_process = [Path(f) for f in files_to_process]
+        self._sane_stems = self._sanitize_stems(self.files_to_process)
         self.target_bitrate_mbps = target_bitrate_mbps
         self.hw_info = hw_info
         self.global_output_directory = output_directory
@@ -70,6 +282,7 @@ class EncoderWorker(QObject):
         self.audio_settings = audio_settings
         self.video_settings = video_settings
         self.parent_gui = parent_gui
+        self.max_parallel_jobs = max(1, max_parallel_jobs)
         self.selected_target_width = None
         self.selected_target_height = None
 
@@ -79,29 +292,73 @@ class EncoderWorker(QObject):
 
         self._is_running = True
         self._was_stopped_manually = False
+        # Индекс последнего запущенного файла очереди
         self.current_file_index = -1
-        self.current_output_file = None
-        self.current_temp_dir = None
-        self.current_file_duration = 0
+        # Активные кодирования: индекс файла -> EncodeJob
+        self._jobs = {}
+        # Общая временная папка сессии; у каждого файла в ней своя подпапка,
+        # удаляется одним вызовом в конце очереди
+        self._session_temp_root = None
+        # Уже извлеченные шрифты сессии: (имя файла, размер) -> путь в кэше.
+        # В пакете серий обычно одни и те же вложения
+        self._fonts_cache = {}
+        # Настройки энкодера, общие для всех файлов (см. _get_base_enc_settings)
+        self._base_enc_settings = None
+        # Имена файлов в папках вывода (os.path.normcase), читаются
+        # один раз на папку вместо stat для каждого файла
+        self._existing_outputs = {}
+        # Фоновый анализ (ffprobe, cropdetect) следующих файлов очереди:
+        # индекс файла -> Future с результатом _analyze_file.
+        # Тот же пул выполняет cropdetect текущего файла без предзагрузки
+        self._prefetch_pool = None
+        self._prefetched = {}
+        # Остановка завершает запущенные в пуле процессы cropdetect:
+        # shutdown(wait=False) их не прерывает
+        self._analysis_stop = threading.Event()
+        # Фоновое удаление папок обработанных файлов: не задерживает запуск
+        # следующего кодирования и не копит на диске файлы длинной очереди
+        self._cleanup_pool = None
+        # Выбор дорожки субтитров "для всех файлов": набор дорожек
+        # (название, язык) -> позиция выбранной дорожки или None
+        self._sub_choice_cache = {}
+        # Идет запуск файлов очереди (защита process_next_file от повторного
+        # входа)
+        self._scheduling = False
+        # Последнее еще не отправленное обновление прогресса (поля блока)
+        self._pending_progress = None
+        # Когда последний раз пересчитывалась оценка времени очереди
+        self._last_queue_eta_ts = 0.0
+        self._progress_timer = QTimer(self)
+        self._progress_timer.setInterval(PROGRESS_EMIT_INTERVAL_MS)
+        self._progress_timer.timeout.connect(self._flush_progress)
 
-        self._process = QProcess(self)
-        self._process.readyReadStandardError.connect(self.read_stderr)
-        self._process.finished.connect(self.on_process_finished)
+        # Слоты сессий NVENC: драйвер ограничивает число одновременных
+        # кодирований, превышение приводит к ошибке ffmpeg посреди очереди.
+        # Лимит определяется по названию GPU и может быть ошибочным, поэтому
+        # число заданий, явно выбранное пользователем, его превышает
+        self._detected_nvenc_sessions = hw_info.get(
+            'max_nvenc_sessions', NVENC_DEFAULT_MAX_SESSIONS
+        )
+        self._nvenc_sem = threading.BoundedSemaphore(
+            max(self._detected_nvenc_sessions, self.max_parallel_jobs)
+        )
 
         self.total_start_time = None
-        self.current_file_start_time = None
         self.total_duration = 0
         self.processed_files_duration = 0
         self.processed_files_time = 0
         self.last_file_speed = 1.0
 
-        # Буфер для накопления всего stderr
-        self._full_stderr_log = []
-
 
     def _log(self, message, level="info"):
+        if LOG_LEVELS.get(level, LOG_LEVELS['info']) < self._log_min:
+            return
         self.log_message.emit(message, level)
 
+    def _debug_enabled(self) -> bool:
+        """Проверка перед формированием дорогих отладочных сообщений."""
+        return self._log_min <= LOG_LEVELS['debug']
+
     def format_time(self, seconds: float) -> str:
         """Форматирует время в секундах в строку ЧЧ:ММ:СС"""
         if seconds is None or seconds < 0:
@@ -112,10 +369,12 @@ class EncoderWorker(QObject):
         return f"{hours:02d}:{minutes:02d}:{secs:02d}"
 
     def calculate_queue_eta(
-        self, current_file_progress: float, current_speed: float
+        self, current_done_seconds: float, current_speed: float
     ) -> str:
         """
-        Рассчитывает оставшееся время для всей очереди и общее прошедшее время
+        Рассчитывает оставшееся время для всей очереди и общее прошедшее время.
+        current_done_seconds - сколько секунд видео уже закодировано в
+        активных файлах, current_speed - их суммарная скорость.
         """
         if not self.total_start_time:
             return None
@@ -130,76 +389,577 @@ class EncoderWorker(QObject):
             remaining_duration = (
                 self.total_duration - self.processed_files_duration
             )
-            if current_file_progress is not None:
-                remaining_duration -= (
-                    (current_file_progress / 100.0) *
-                    (self.total_duration - self.processed_files_duration)
-                )
+            if current_done_seconds is not None:
+                remaining_duration -= current_done_seconds
             eta_str = self.format_time(
-                remaining_duration / self.last_file_speed
+                max(remaining_duration, 0) / self.last_file_speed
             )
         return f"Прошло всего: {elapsed_str} | Осталось для очереди: {eta_str}"
 
-    def calculate_real_elapsed(self) -> str:
-        if not self.current_file_start_time:
+    def calculate_real_elapsed(self, start_time: float | None) -> str:
+        if not start_time:
             return None
-        elapsed_seconds = time.time() - self.current_file_start_time
+        elapsed_seconds = time.time() - start_time
         return self.format_time(elapsed_seconds)
 
+    @pyqtSlot()
     def run(self):
         self.total_start_time = time.time()
-        for file_path in self.files_to_process:
+        self._drop_duplicate_files()
+        self.total_duration += self._prescan_total_duration()
+        if self.max_parallel_jobs > 1:
+            self._log(
+                f"Одновременных кодирований: до {self.max_parallel_jobs}",
+                "info"
+            )
+        if (self.video_settings.get('encoder_type', 'gpu') != 'cpu' and
+                self.max_parallel_jobs > self._detected_nvenc_sessions):
+            self._log(
+                f"Выбрано больше кодирований, чем определенный лимит сессий "
+                f"NVENC ({self._detected_nvenc_sessions}): если драйвер "
+                "его не допускает, лишние файлы завершатся ошибкой.",
+                "warning"
+            )
+        self.process_next_file()
+
+    def _prescan_total_duration(self) -> float:
+        """
+        Суммарная длительность очереди для общего ETA. ffprobe для файлов
+        запускаются параллельно; результаты попадают в кэш анализа, поэтому
+        при обработке файла повторного запуска ffprobe не будет.
+        """
+        if not self.files_to_process:
+            return 0.0
+
+        def probe_duration(file_path: Path) -> float | None:
             try:
                 # Нам нужна только длительность
-                duration = get_video_subtitle_attachment_info(file_path)[0]
-                if duration:
-                    self.total_duration += duration
+                return get_cached_video_info(
+                    file_path, get_video_subtitle_attachment_info
+                )[0]
             except Exception:
+                return None
+
+        workers = min(PRESCAN_MAX_WORKERS, len(self.files_to_process))
+        with ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="EncoderPrescan"
+        ) as pool:
+            durations = pool.map(probe_duration, self.files_to_process)
+            return sum(d for d in durations if d)
+
+    @staticmethod
+    def _sanitize_stems(files: list) -> list:
+        """Очищенные имена файлов для временных папок, по одному на файл очереди."""
+        return [sanitize_filename_part(f.stem, max_length=40) for f in files]
+
+    def _drop_duplicate_files(self):
+        """Убирает из очереди повторно добавленные файлы."""
+        seen = set()
+        unique_files = []
+        for file_path in self.files_to_process:
+            key = os.path.normcase(os.path.abspath(file_path))
+            if key in seen:
+                self._log(
+                    f"Файл {file_path.name} добавлен в очередь повторно, "
+                    "дубликат пропущен.",
+                    "warning"
+                )
                 continue
-        self.process_next_file()
+            seen.add(key)
+            unique_files.append(file_path)
+        if len(unique_files) != len(self.files_to_process):
+            self.files_to_process = unique_files
+            self._sane_stems = self._sanitize_stems(unique_files)
+
+    def _is_heavy_file(self, input_file_path: Path) -> bool:
+        """
+        Проверяет, больше ли кадр файла PARALLEL_MAX_PIXELS. Информация
+        берется из кэша анализа, заполненного при подсчете длительности.
+        """
+        file_info = get_cached_video_info(
+            input_file_path, get_video_subtitle_attachment_info
+        )
+        width, height = file_info[3], file_info[4]
+        return bool(width and height and width * height > PARALLEL_MAX_PIXELS)
 
     def process_next_file(self):
-        if not self._is_running:
-            self.finish_all_processing()
+        """
+        Запускает следующие файлы очереди, пока есть свободные слоты.
+        Когда активных кодирований не осталось, завершает сессию.
+        """
+        if self._scheduling:
+            # QProcess.start может синхронно сообщить об ошибке запуска, и
+            # on_process_finished вызовет этот метод повторно. Внешний цикл
+            # сам продолжит очередь и завершит сессию ровно один раз
             return
+        self._scheduling = True
+        try:
+            self._start_queued_jobs()
+        finally:
+            self._scheduling = False
 
-        self.current_file_index += 1
-        if self.current_file_index >= len(self.files_to_process):
+        if self._jobs:
+            return
+        if (self._is_running and
+                self.current_file_index + 1 >= len(self.files_to_process)):
             self._log("\n--- Все файлы обработаны. ---", "info")
-            self.finish_all_processing()
+        self.finish_all_processing()
+
+    def _start_queued_jobs(self):
+        uses_nvenc = self.video_settings.get('encoder_type', 'gpu') != 'cpu'
+        while (self._is_running and
+               len(self._jobs) < self.max_parallel_jobs and
+               self.current_file_index + 1 < len(self.files_to_process)):
+            next_file = self.files_to_process[self.current_file_index + 1]
+            exclusive = (
+                self.max_parallel_jobs > 1 and self._is_heavy_file(next_file)
+            )
+            if self._jobs and (exclusive or any(
+                    job.exclusive for job in self._jobs.values())):
+                # Файл выше 1080p ждет, пока он не останется единственным
+                self._log(
+                    f"  Файл {self.current_file_index + 2} ожидает: файлы "
+                    "выше 1080p кодируются без параллельных заданий.",
+                    "debug"
+                )
+                break
+            if uses_nvenc and not self._nvenc_sem.acquire(blocking=False):
+                # Все сессии NVENC заняты: файл ждет завершения текущих
+                self._log(
+                    f"  Свободных сессий NVENC нет, файл "
+                    f"{self.current_file_index + 2} ожидает в очереди "
+                    f"(активно: {len(self._jobs)}).",
+                    "debug"
+                )
+                break
+            self.current_file_index += 1
+            job = EncodeJob(
+                self.current_file_index,
+                self.files_to_process[self.current_file_index]
+            )
+            job.holds_nvenc_slot = uses_nvenc
+            job.exclusive = exclusive
+            self._start_job(job)
+
+    def _is_primary_job(self, job: EncodeJob) -> bool:
+        """Прогресс в GUI показывается для самого раннего активного файла."""
+        return not self._jobs or job.index == min(self._jobs)
+
+    def _get_session_temp_root(self) -> Path:
+        """Создает временную папку сессии при первом обращении."""
+        if self._session_temp_root is None:
+            if TRANSCODE_TEMP_DIR is not None:
+                TRANSCODE_TEMP_DIR.mkdir(parents=True, exist_ok=True)
+            self._session_temp_root = Path(
+                tempfile.mkdtemp(prefix="enc_session_", dir=TRANSCODE_TEMP_DIR)
+            )
+            self._log(
+                f"Создана временная папка сессии: {self._session_temp_root}",
+                "debug"
+            )
+        return self._session_temp_root
+
+    @staticmethod
+    def _font_cache_key(font_info: dict) -> tuple[str, int] | None:
+        size = font_info.get('size')
+        if not font_info.get('filename') or size is None:
+            return None
+        try:
+            return Path(font_info['filename']).name, int(size)
+        except (TypeError, ValueError):
+            return None
+
+    def _reuse_cached_fonts(
+        self, font_attachments: list[dict], fonts_dir: Path
+    ) -> tuple[list[dict], int]:
+        """
+        Связывает с папкой шрифтов файла уже извлеченные в этой сессии шрифты.
+        Возвращает (шрифты, которые нужно извлечь, число взятых из кэша).
+        """
+        to_extract = []
+        reused = 0
+        for font_info in font_attachments:
+            cached_path = self._fonts_cache.get(
+                self._font_cache_key(font_info)
+            )
+            if cached_path is None:
+                to_extract.append(font_info)
+                continue
+            try:
+                link_or_copy(cached_path, fonts_dir / cached_path.name)
+                reused += 1
+            except OSError as e:
+                self._log(
+                    f"    Не удалось взять шрифт '{cached_path.name}' "
+                    f"из кэша: {e}", "debug"
+                )
+                to_extract.append(font_info)
+        if reused:
+            self._log(f"    Шрифтов из кэша сессии: {reused}", "info")
+        return to_extract, reused
+
+    def _store_fonts_in_cache(self, extracted: list[dict], fonts_dir: Path):
+        """Сохраняет извлеченные шрифты в кэш сессии для следующих файлов."""
+        cache_root = self._get_session_temp_root() / "fonts_cache"
+        for font_info in extracted:
+            key = self._font_cache_key(font_info)
+            if key is None or key in self._fonts_cache:
+                continue
+            font_path = fonts_dir / key[0]
+            if not font_path.is_file():
+                continue
+            # Одноименные шрифты разного размера хранятся в разных папках
+            cached_path = cache_root / str(key[1]) / key[0]
+            try:
+                cached_path.parent.mkdir(parents=True, exist_ok=True)
+                link_or_copy(font_path, cached_path)
+            except OSError as e:
+                self._log(
+                    f"    Не удалось сохранить шрифт '{key[0]}' в кэш: {e}",
+                    "debug"
+                )
+                continue
+            self._fonts_cache[key] = cached_path
+
+    def _choose_subtitle_track(self, tracks: list, filename: str) -> dict | None:
+        """
+        Спрашивает у пользователя дорожку субтитров. Если выбор отмечен
+        "для всех файлов", он повторяется без диалога для файлов с тем же
+        набором дорожек.
+        """
+        signature = tuple(
+            (t.get('title'), t.get('language')) for t in tracks
+        )
+        if signature in self._sub_choice_cache:
+            position = self._sub_choice_cache[signature]
+            self._log(
+                "    Субтитры по-умолчанию не найдены. Применен выбор, "
+                "сделанный для предыдущих файлов.",
+                "info"
+            )
+            return tracks[position] if position is not None else None
+
+        self._log(
+            f"    Субтитры по-умолчанию не найдены. "
+            f"Найдены другие дорожки ({len(tracks)} шт.). "
+            f"Запрос выбора...",
+            "warning"
+        )
+        result = QMetaObject.invokeMethod(
+            self.parent_gui,
+            "prompt_for_subtitle_selection",
+            Qt.ConnectionType.BlockingQueuedConnection,
+            Q_RETURN_ARG('QVariant'),
+            Q_ARG(list, tracks),
+            Q_ARG(str, filename)
+        ) or {}
+        chosen = result.get('track')
+        if result.get('apply_to_all'):
+            self._sub_choice_cache[signature] = (
+                tracks.index(chosen) if chosen in tracks else None
+            )
+        return chosen
+
+    def _get_base_enc_settings(self) -> tuple[dict, list]:
+        """
+        Собирает настройки энкодера и аудио один раз за сессию.
+        Возвращает (enc_settings, части строки лога режима кодирования);
+        вызывающий копирует словарь перед изменением.
+        """
+        if self._base_enc_settings is not None:
+            return self._base_enc_settings
+
+        # Определяем тип энкодера
+        encoder_type = self.video_settings.get('encoder_type', 'gpu')
+
+        # Базовые настройки аудио
+        a_codec = self.audio_settings.get('codec', AUDIO_CODEC)
+
+        enc_settings = {
+            'audio_codec': a_codec,
+            'audio_bitrate': self.audio_settings.get('bitrate', AUDIO_BITRATE),
+            'audio_channels': self.audio_settings.get('channels', AUDIO_CHANNELS),
+            'audio_track_title': self.audio_settings.get('title', DEFAULT_AUDIO_TRACK_TITLE),
+            'audio_track_language': self.audio_settings.get('language', DEFAULT_AUDIO_TRACK_LANGUAGE),
+        }
+
+        log_parts = []
+
+        if encoder_type == 'cpu':
+            # --- CPU (x265) Settings ---
+            enc_settings['codec'] = 'libx265'
+            enc_settings['preset'] = self.video_settings.get('preset', 'medium')
+
+            rc_mode = self.video_settings.get('rc_mode', 'crf')
+            if rc_mode == 'crf':
+                crf = self.video_settings.get('crf', 23)
+                enc_settings['crf'] = crf
+                # libx265 не использует флаги bitrates для crf
+                log_parts.append(f"CPU x265 (Preset: {enc_settings['preset']}, CRF: {crf})")
+            else:
+                bitrate_kbps = self.video_settings.get('bitrate', 4000)
+                enc_settings['bitrate'] = f"{bitrate_kbps}k"
+                log_parts.append(f"CPU x265 (Preset: {enc_settings['preset']}, Bitrate: {enc_settings['bitrate']})")
+
+        else:
+            # --- GPU (NVENC) Settings ---
+            enc_settings['codec'] = 'hevc_nvenc'
+            enc_settings['preset'] = self.video_settings.get('preset', NVENC_PRESET)
+            enc_settings['tuning'] = self.video_settings.get('tuning', NVENC_TUNING)
+            enc_settings['rc_mode'] = self.video_settings.get('rc', NVENC_RC)
+            lookahead_val = self.video_settings.get('lookahead')
+            if lookahead_val is True:
+                enc_settings['lookahead'] = '32'
+            elif lookahead_val is not None:
+                enc_settings['lookahead'] = str(lookahead_val)
+            else:
+                enc_settings['lookahead'] = None
+            enc_settings['spatial_aq'] = '1' if self.video_settings.get('aq', True) else '0'
+            enc_settings['aq_strength'] = NVENC_AQ_STRENGTH
+            enc_settings['force_10bit_output'] = self.video_settings.get('force_10bit', False)
+
+            # Bitrate logic for NVENC
+            if enc_settings['rc_mode'] == 'constqp':
+                qp = self.video_settings.get('qp', LOSSLESS_QP_VALUE)
+                enc_settings['qp_value'] = qp
+                log_parts.append(f"NVENC (Preset: {enc_settings['preset']}, QP: {qp})")
+            else:
+                bitrate_kbps = self.video_settings.get('bitrate', 4000)
+                target_br_str = f"{bitrate_kbps}k"
+                max_br_str = f"{bitrate_kbps * 2}k"
+                buf_size_str = f"{bitrate_kbps * 4}k"
+
+                enc_settings['target_bitrate'] = target_br_str
+                enc_settings['min_bitrate'] = target_br_str
+                enc_settings['max_bitrate'] = max_br_str
+                enc_settings['bufsize'] = buf_size_str
+
+                log_parts.append(f"NVENC (Preset: {enc_settings['preset']}, Bitrate: {target_br_str})")
+
+        log_parts.append(f"Аудио: {enc_settings['audio_codec']}")
+
+        if self.max_parallel_jobs > 1:
+            # По умолчанию каждый ffmpeg берет потоки декодера и фильтров
+            # по числу ядер; при параллельных кодированиях делим ядра между
+            # ними, чтобы процессы не вытесняли друг друга
+            cpu_share = max(1, (os.cpu_count() or 1) // self.max_parallel_jobs)
+            enc_settings['decode_threads'] = cpu_share
+            enc_settings['filter_threads'] = max(2, cpu_share)
+            log_parts.append(f"Потоков CPU на файл: {cpu_share}")
+
+        self._base_enc_settings = (enc_settings, log_parts)
+        return self._base_enc_settings
+
+    def _output_exists(self, output_file: Path) -> bool:
+        """
+        Проверяет, есть ли уже выходной файл. Содержимое папки вывода
+        читается один раз за сессию; при первом обращении папка создается.
+        """
+        output_dir = output_file.parent
+        existing = self._existing_outputs.get(output_dir)
+        if existing is None:
+            output_dir.mkdir(parents=True, exist_ok=True)
+            with os.scandir(output_dir) as entries:
+                existing = {os.path.normcase(entry.name) for entry in entries}
+            self._existing_outputs[output_dir] = existing
+        return os.path.normcase(output_file.name) in existing
+
+    def _set_output_exists(self, output_file: Path, exists: bool):
+        existing = self._existing_outputs.get(output_file.parent)
+        if existing is None:
             return
+        name = os.path.normcase(output_file.name)
+        if exists:
+            existing.add(name)
+        else:
+            existing.discard(name)
+
+    def _detect_crop(self, input_file_path: Path, file_info: tuple) -> tuple[str | None, list]:
+        """
+        Определяет параметры обрезки, если включен автокроп. Выполняется в
+        фоновом потоке, поэтому сообщения не отправляются сразу, а
+        возвращаются списком (сообщение, уровень).
+        """
+        logs = []
+
+        def log(message, level="info"):
+            logs.append((message, level))
 
-        input_file_path = self.files_to_process[self.current_file_index]
-        self.current_file_start_time = time.time()
-        self.overall_progress.emit(
-            self.current_file_index + 1, len(self.files_to_process), ""
+        _, _, _, source_width, source_height = file_info[:5]
+        info_error = file_info[-1]
+        detected_crop = None
+        if (self.auto_crop_enabled and not info_error and
+                source_width and source_height):
+            # Размеры уже известны из ffprobe, а при наличии NVDEC
+            # декодирование для cropdetect тоже выполняется на GPU
+            use_hwaccel = (
+                self.video_settings.get('encoder_type', 'gpu') != 'cpu' and
+                bool(self.hw_info.get('decoder_map'))
+            )
+            detected_crop = get_cached_crop(
+                input_file_path,
+                f"{CROP_ANALYSIS_SECONDS}:{CROP_LIMIT_VALUE}",
+                lambda: get_crop_parameters(
+                    input_file_path, log,
+                    duration_for_analysis_sec=CROP_ANALYSIS_SECONDS,
+                    limit_value=CROP_LIMIT_VALUE,
+                    source_size=(source_width, source_height),
+                    use_hwaccel=use_hwaccel,
+                    stop_event=self._analysis_stop
+                )
+            )
+        return detected_crop, logs
+
+    def _analyze_file(self, input_file_path: Path) -> tuple[tuple, str | None, list]:
+        """Получает информацию о файле и параметры обрезки (для предзагрузки)."""
+        file_info = get_cached_video_info(
+            input_file_path, get_video_subtitle_attachment_info
         )
-        self.progress.emit(0, input_file_path.name)
+        detected_crop, logs = self._detect_crop(input_file_path, file_info)
+        return file_info, detected_crop, logs
+
+    def _get_analysis_pool(self) -> ThreadPoolExecutor:
+        if self._prefetch_pool is None:
+            # Два потока: cropdetect текущего файла не ждет предзагрузку
+            # следующего
+            self._prefetch_pool = ThreadPoolExecutor(
+                max_workers=2, thread_name_prefix="EncoderAnalysis"
+            )
+        return self._prefetch_pool
+
+    def _get_output_file(self, input_file_path: Path) -> Path:
+        output_dir = (
+            input_file_path.parent if self.use_source_path
+            else self.global_output_directory
+        )
+        return output_dir / f"{input_file_path.stem}.mp4"
+
+    def _prefetch_file(self, index: int):
+        """Запускает анализ файла очереди в фоне, пока кодируются текущие."""
+        if (not self._is_running or index >= len(self.files_to_process) or
+                index in self._prefetched):
+            return
+        if (not self.overwrite_existing and self._output_exists(
+                self._get_output_file(self.files_to_process[index]))):
+            # Файл будет пропущен, анализировать его не нужно
+            return
+        self._prefetched[index] = self._get_analysis_pool().submit(
+            self._analyze_file, self.files_to_process[index]
+        )
+
+    def _get_file_analysis(self, index: int, input_file_path: Path) -> tuple[tuple, Future]:
+        """
+        Возвращает информацию о файле и Future с результатом _detect_crop.
+        Без предзагрузки cropdetect запускается в фоне и идет параллельно
+        с извлечением шрифтов и субтитров.
+        """
+        future = self._prefetched.pop(index, None)
+        if future is not None:
+            # Если анализ еще идет, дожидаемся его вместо повторного запуска
+            file_info, detected_crop, logs = future.result()
+            crop_future = Future()
+            crop_future.set_result((detected_crop, logs))
+            return file_info, crop_future
+
+        file_info = get_cached_video_info(
+            input_file_path, get_video_subtitle_attachment_info
+        )
+        if self.auto_crop_enabled and not file_info[-1]:
+            crop_future = self._get_analysis_pool().submit(
+                self._detect_crop, input_file_path, file_info
+            )
+        else:
+            crop_future = Future()
+            crop_future.set_result((None, []))
+        return file_info, crop_future
+
+    def _shutdown_prefetch(self):
+        self._analysis_stop.set()
+        for future in self._prefetched.values():
+            future.cancel()
+        self._prefetched.clear()
+        if self._prefetch_pool is not None:
+            self._prefetch_pool.shutdown(wait=False, cancel_futures=True)
+            self._prefetch_pool = None
+
+    def _start_job(self, job: EncodeJob):
+        """Готовит файл (субтитры, шрифты, кроп) и запускает ffmpeg."""
+        input_file_path = job.input_file
+        job.start_time = time.time()
+        if self._is_primary_job(job):
+            self.overall_progress.emit(
+                job.index + 1, len(self.files_to_process), ""
+            )
+            self._emit_progress(0, job.name)
         self._log(
-            f"\n--- [{self.current_file_index + 1}/{len(self.files_to_process)}] "
-            f"Начало обработки: {input_file_path.name} ---",
+            f"\n--- [{job.index + 1}/{len(self.files_to_process)}] "
+            f"Начало обработки: {job.name} ---",
             "info"
         )
-        # Очищаем буфер stderr перед началом обработки нового файла
-        self._full_stderr_log = []
 
         try:
-            sane_stem = sanitize_filename_part(
-                input_file_path.stem, max_length=40
+            # Проверка выходного файла дешевая, поэтому идет до ffprobe,
+            # cropdetect и временной папки: при повторном запуске прерванной
+            # очереди готовые файлы пропускаются без анализа
+            job.output_file = self._get_output_file(input_file_path)
+            output_dir = job.output_file.parent
+            # Два входа с одинаковым именем (video.mkv и video.mp4)
+            # не должны одновременно писать в один выходной файл
+            busy_output = next(
+                (j for j in self._jobs.values()
+                 if j.output_file == job.output_file), None
             )
-            self.current_temp_dir = Path(
-                tempfile.mkdtemp(prefix=f"enc_{sane_stem}_")
+            if busy_output is not None:
+                self._log(
+                    f"  [ПРОПУСК] Файл '{job.output_file.name}' сейчас "
+                    f"записывается при обработке {busy_output.name}.",
+                    "error"
+                )
+                self.file_processed.emit(
+                    job.name, False,
+                    "Выходной файл уже кодируется из другого источника"
+                )
+                self.cleanup_after_file(job)
+                return
+            output_exists = self._output_exists(job.output_file)
+
+            if output_exists and not self.overwrite_existing:
+                self._log(
+                    f"  [ПРОПУСК] Файл '{job.output_file.name}' "
+                    "уже существует.",
+                    "warning"
+                )
+                self.file_processed.emit(
+                    job.name, True,
+                    "Файл уже существует (пропущен)"
+                )
+                self.cleanup_after_file(job)
+                return
+            elif output_exists and self.overwrite_existing:
+                self._log(
+                    f"  [ПЕРЕЗАПИСЬ] Файл '{job.output_file.name}' "
+                    "будет перезаписан.",
+                    "warning"
+                )
+
+            job.temp_dir = (
+                self._get_session_temp_root() /
+                f"f{job.index:05d}_{self._sane_stems[job.index]}"
             )
+            job.temp_dir.mkdir()
             self._log(
-                f"  Создана временная папка: {self.current_temp_dir.name}",
+                f"  Создана временная папка: {job.temp_dir.name}",
                 "debug"
             )
 
+            file_info, crop_future = self._get_file_analysis(
+                job.index, input_file_path
+            )
             (
                 duration, input_codec, pix_fmt, source_width, source_height,
                 default_subtitle_info, all_subtitle_tracks, font_attachments,
                 info_error
-            ) = get_video_subtitle_attachment_info(input_file_path)
+            ) = file_info
 
             if info_error:
                 raise ValueError(
@@ -208,7 +968,7 @@ class EncoderWorker(QObject):
             if not all([duration, input_codec, pix_fmt, source_width, source_height]):
                 raise ValueError("Не удалось получить полную информацию о файле.")
 
-            self.current_file_duration = duration
+            job.duration = duration
             self._log(
                 f"  Инфо: Длительность={duration:.2f}s, Кодек={input_codec}, "
                 f"Разрешение={source_width}x{source_height}, PixFmt={pix_fmt}",
@@ -229,19 +989,8 @@ class EncoderWorker(QObject):
                         "info"
                     )
                 elif all_subtitle_tracks and self.hw_info.get('subtitles_filter'):
-                    self._log(
-                        f"    Субтитры по-умолчанию не найдены. "
-                        f"Найдены другие дорожки ({len(all_subtitle_tracks)} шт.). "
-                        f"Запрос выбора...",
-                        "warning"
-                    )
-                    chosen_sub = QMetaObject.invokeMethod(
-                        self.parent_gui,
-                        "prompt_for_subtitle_selection",
-                        Qt.ConnectionType.BlockingQueuedConnection,
-                        Q_RETURN_ARG('QVariant'),
-                        Q_ARG(list, all_subtitle_tracks),
-                        Q_ARG(str, input_file_path.name)
+                    chosen_sub = self._choose_subtitle_track(
+                        all_subtitle_tracks, job.name
                     )
                     if chosen_sub:
                         subtitle_to_burn = chosen_sub
@@ -257,40 +1006,49 @@ class EncoderWorker(QObject):
                             "info"
                         )
 
+                fonts_dir = None
                 if font_attachments:
                     self._log(
                         f"    Встроенные шрифты: {len(font_attachments)} шт.",
                         "info"
                     )
-                    fonts_dir = self.current_temp_dir / "extracted_fonts"
+                    fonts_dir = job.temp_dir / "extracted_fonts"
                     fonts_dir.mkdir(exist_ok=True)
-                    if extract_attachments(
-                        input_file_path, font_attachments, fonts_dir, self._log
-                    ) > 0:
-                        extracted_fonts_dir = str(fonts_dir)
-                        self._log(
-                            f"    Шрифты извлечены в: {extracted_fonts_dir}",
-                            "info"
-                        )
                 else:
                     self._log("    Встроенные шрифты: Не найдены", "info")
 
-                if subtitle_to_burn:
-                    subtitle_temp_file = extract_subtitle_track(
-                        input_file_path, subtitle_to_burn,
-                        self.current_temp_dir, self._log,
-                        remove_credits=self.remove_credit_lines
+                fonts_to_extract = font_attachments
+                cached_fonts_count = 0
+                if font_attachments:
+                    fonts_to_extract, cached_fonts_count = (
+                        self._reuse_cached_fonts(font_attachments, fonts_dir)
                     )
 
+                # Шрифты и субтитры извлекаются одним запуском ffmpeg
+                fonts_count, subtitle_temp_file = extract_fonts_and_subtitle(
+                    input_file_path, fonts_to_extract, fonts_dir,
+                    subtitle_to_burn, job.temp_dir, self._log,
+                    remove_credits=self.remove_credit_lines
+                )
+                if fonts_count:
+                    self._store_fonts_in_cache(fonts_to_extract, fonts_dir)
+                fonts_count += cached_fonts_count
+                if fonts_count > 0:
+                    extracted_fonts_dir = str(fonts_dir)
+                    self._log(
+                        f"    Шрифты извлечены в: {extracted_fonts_dir}",
+                        "info"
+                    )
+
+            detected_crop, crop_logs = crop_future.result()
+            for message, level in crop_logs:
+                self._log(message, level)
+
             # <<< ИЗМЕНЕНИЕ: Возвращена продвинутая логика обрезки (crop)
             crop_params_for_ffmpeg = None
             cropped_width_after_detect = None
             cropped_height_after_detect = None
             if self.auto_crop_enabled:
-                detected_crop = get_crop_parameters(
-                    input_file_path, self._log,
-                    duration_for_analysis_sec=30, limit_value=24
-                )
                 if detected_crop:
                     try:
                         cw, ch, cx, cy = map(int, detected_crop.split(':'))
@@ -327,57 +1085,32 @@ class EncoderWorker(QObject):
             final_scale_target_w, final_scale_target_h = None, None
             if (self.force_resolution and
                     self.selected_target_width and self.selected_target_height):
+                final_scale_target_w, final_scale_target_h = plan_scale_target(
+                    self.selected_target_width, self.selected_target_height,
+                    cropped_width_after_detect, cropped_height_after_detect
+                )
                 if cropped_width_after_detect and cropped_height_after_detect:
-                    aspect_ratio_after_crop = (
-                        cropped_width_after_detect / cropped_height_after_detect
-                    )
-                    final_scale_target_h = self.selected_target_height
-                    final_scale_target_w = int(round(
-                        final_scale_target_h * aspect_ratio_after_crop
-                    ))
-                    if final_scale_target_w % 2 != 0:
-                        final_scale_target_w -= 1
-                    if final_scale_target_h % 2 != 0:
-                        final_scale_target_h -= 1
                     self._log(
                         f"    После кропа, масштабируем до "
                         f"{final_scale_target_w}x{final_scale_target_h}.",
                         "info"
                     )
                 else:
-                    final_scale_target_w = self.selected_target_width
-                    final_scale_target_h = self.selected_target_height
                     self._log(
                         f"    Масштабируем до "
                         f"{final_scale_target_w}x{final_scale_target_h}.",
                         "info"
                     )
 
-            output_dir = (
-                input_file_path.parent if self.use_source_path
-                else self.global_output_directory
-            )
-            output_dir.mkdir(parents=True, exist_ok=True)
-            self.current_output_file = output_dir / f"{input_file_path.stem}.mp4"
-
-            if self.current_output_file.exists() and not self.overwrite_existing:
+            job.encode_output = job.output_file
+            if is_network_path(output_dir):
+                # Мелкие записи mp4-муксера и перезапись файла для faststart
+                # идут на локальный диск, в сеть файл копируется один раз
+                job.encode_output = job.temp_dir / job.output_file.name
                 self._log(
-                    f"  [ПРОПУСК] Файл '{self.current_output_file.name}' "
-                    "уже существует.",
-                    "warning"
-                )
-                self.file_processed.emit(
-                    input_file_path.name, True,
-                    "Файл уже существует (пропущен)"
-                )
-                self.cleanup_after_file()
-                self.process_next_file()
-                return
-            elif self.current_output_file.exists() and self.overwrite_existing:
-                self._log(
-                    f"  [ПЕРЕЗАПИСЬ] Файл '{self.current_output_file.name}' "
-                    "будет перезаписан.",
-                    "warning"
+                    "    Папка вывода на сетевом диске: кодирование во "
+                    "временный файл с последующим перемещением.",
+                    "info"
                 )
 
             # <<< ИЗМЕНЕНИЕ: Возвращена подробная логика выбора 10-бит
@@ -404,256 +1137,370 @@ class EncoderWorker(QObject):
                         "info"
                     )
 
-            # Определяем тип энкодера
-            encoder_type = self.video_settings.get('encoder_type', 'gpu')
-            
-            # Базовые настройки аудио
-            a_codec = self.audio_settings.get('codec', AUDIO_CODEC)
-            
-            enc_settings = {
-                'audio_codec': a_codec,
-                'audio_bitrate': self.audio_settings.get('bitrate', AUDIO_BITRATE),
-                'audio_channels': self.audio_settings.get('channels', AUDIO_CHANNELS),
-                'audio_track_title': self.audio_settings.get('title', DEFAULT_AUDIO_TRACK_TITLE),
-                'audio_track_language': self.audio_settings.get('language', DEFAULT_AUDIO_TRACK_LANGUAGE),
-            }
-
-            log_parts = []
-            
-            if encoder_type == 'cpu':
-                # --- CPU (x265) Settings ---
-                enc_settings['codec'] = 'libx265'
-                enc_settings['preset'] = self.video_settings.get('preset', 'medium')
-                
-                rc_mode = self.video_settings.get('rc_mode', 'crf')
-                if rc_mode == 'crf':
-                    crf = self.video_settings.get('crf', 23)
-                    enc_settings['crf'] = crf
-                    # libx265 не использует флаги bitrates для crf
-                    log_parts.append(f"CPU x265 (Preset: {enc_settings['preset']}, CRF: {crf})")
-                else:
-                    bitrate_kbps = self.video_settings.get('bitrate', 4000)
-                    enc_settings['bitrate'] = f"{bitrate_kbps}k"
-                    log_parts.append(f"CPU x265 (Preset: {enc_settings['preset']}, Bitrate: {enc_settings['bitrate']})")
-                    
-            else:
-                # --- GPU (NVENC) Settings ---
-                enc_settings['codec'] = 'hevc_nvenc'
-                enc_settings['preset'] = self.video_settings.get('preset', NVENC_PRESET)
-                enc_settings['tuning'] = self.video_settings.get('tuning', NVENC_TUNING)
-                enc_settings['rc_mode'] = self.video_settings.get('rc', NVENC_RC)
-                lookahead_val = self.video_settings.get('lookahead')
-                if lookahead_val is True:
-                    enc_settings['lookahead'] = '32'
-                elif lookahead_val is not None:
-                    enc_settings['lookahead'] = str(lookahead_val)
-                else:
-                    enc_settings['lookahead'] = None
-                enc_settings['spatial_aq'] = '1' if self.video_settings.get('aq', True) else '0'
-                enc_settings['aq_strength'] = NVENC_AQ_STRENGTH
-                enc_settings['force_10bit_output'] = self.video_settings.get('force_10bit', False) or is_10bit
-                
-                # Bitrate logic for NVENC
-                if enc_settings['rc_mode'] == 'constqp':
-                     qp = self.video_settings.get('qp', LOSSLESS_QP_VALUE)
-                     enc_settings['qp_value'] = qp
-                     log_parts.append(f"NVENC (Preset: {enc_settings['preset']}, QP: {qp})")
-                else:
-                    bitrate_kbps = self.video_settings.get('bitrate', 4000)
-                    target_br_str = f"{bitrate_kbps}k"
-                    max_br_str = f"{bitrate_kbps * 2}k"
-                    buf_size_str = f"{bitrate_kbps * 4}k"
-                    
-                    enc_settings['target_bitrate'] = target_br_str
-                    enc_settings['min_bitrate'] = target_br_str
-                    enc_settings['max_bitrate'] = max_br_str
-                    enc_settings['bufsize'] = buf_size_str
-                    
-                    log_parts.append(f"NVENC (Preset: {enc_settings['preset']}, Bitrate: {target_br_str})")
-
-            log_parts.append(f"Аудио: {enc_settings['audio_codec']}")
-
-            log_parts.append("10-бит" if is_10bit else "8-бит")
+            # Настройки энкодера одинаковы для всей очереди, от файла
+            # зависит только битность
+            base_settings, base_log_parts = self._get_base_enc_settings()
+            enc_settings = dict(base_settings)
+            if enc_settings['codec'] == 'hevc_nvenc':
+                enc_settings['force_10bit_output'] = (
+                    base_settings['force_10bit_output'] or is_10bit
+                )
+            log_parts = base_log_parts + ["10-бит" if is_10bit else "8-бит"]
             self._log(f"  Режим кодирования: {', '.join(log_parts)}", "info")
 
             ffmpeg_command, dec_name, enc_name = build_ffmpeg_command(
-                input_file_path, self.current_output_file, self.hw_info,
+                input_file_path, job.encode_output, self.hw_info,
                 input_codec, pix_fmt, enc_settings, subtitle_temp_file,
                 extracted_fonts_dir, final_scale_target_w, final_scale_target_h,
                 crop_params_for_ffmpeg
             )
 
             self._log(f"  Декодер: {dec_name}, Энкодер: {enc_name}", "info")
-            self._log("  Команда FFmpeg: " + ' '.join(ffmpeg_command), "debug")
+            if self._debug_enabled():
+                self._log(
+                    "  Команда FFmpeg: " + ' '.join(ffmpeg_command), "debug"
+                )
 
-            self._process.start(ffmpeg_command[0], ffmpeg_command[1:])
+            job.process = self._create_process(job)
+            self._jobs[job.index] = job
+            job.process.start(ffmpeg_command[0], ffmpeg_command[1:])
+            # Пока идет кодирование, готовим следующий файл очереди
+            self._prefetch_file(self.current_file_index + 1)
 
         except Exception as e:
             self._log(
-                f"  Критическая ошибка подготовки файла {input_file_path.name}: {e}",
+                f"  Критическая ошибка подготовки файла {job.name}: {e}",
                 "error"
             )
-            self._log(traceback.format_exc(), "debug")
+            if self._debug_enabled():
+                self._log(traceback.format_exc(), "debug")
             self.file_processed.emit(
-                input_file_path.name, False, f"Ошибка подготовки: {e}"
+                job.name, False, f"Ошибка подготовки: {e}"
             )
-            self.cleanup_after_file()
-            self.process_next_file()
+            self._jobs.pop(job.index, None)
+            self.cleanup_after_file(job)
 
-    @pyqtSlot()
-    def read_stderr(self):
-        data = self._process.readAllStandardError().data().decode(
-            'utf-8', errors='ignore'
+    def _create_process(self, job: EncodeJob) -> QProcess:
+        """Создает QProcess для ffmpeg и связывает его сигналы с заданием."""
+        process = QProcess(self)
+        if not IS_WINDOWS and hasattr(
+            process, 'setUnixProcessParameters'
+        ):
+            # vfork вместо fork (не копируем таблицы страниц GUI-процесса) и
+            # отдельная сессия, чтобы при остановке сигнал получила вся группа
+            # (в PyQt6 этот enum не поддерживает "|", собираем по значениям)
+            flags = QProcess.UnixProcessFlag
+            process.setUnixProcessParameters(flags(
+                flags.UseVFork.value | flags.CreateNewSession.value
+                | flags.CloseFileDescriptors.value
+            ))
+        process.readyReadStandardError.connect(
+            lambda job=job: self.read_stderr(job)
+        )
+        process.readyReadStandardOutput.connect(
+            lambda job=job: self.read_progress(job)
+        )
+        process.finished.connect(
+            lambda exit_code, exit_status, job=job:
+                self.on_process_finished(job, exit_code, exit_status)
         )
-        for line in data.splitlines():
-            if not line:
+        process.errorOccurred.connect(
+            lambda error, job=job: self.on_process_error(job, error)
+        )
+        return process
+
+    def read_stderr(self, job: EncodeJob):
+        data = job.process.readAllStandardError().data()
+        lines, job.stderr_partial = split_chunk_lines(job.stderr_partial, data)
+        self._append_stderr_lines(job, lines)
+
+    def _append_stderr_lines(self, job: EncodeJob, lines: list):
+        for line in lines:
+            # Обрезаем аномально длинные строки
+            line = line[:MAX_STDERR_LINE_LENGTH]
+            classify_stderr_line(line, job.error_lines)
+            job.stderr_log.append(line)
+
+    def read_progress(self, job: EncodeJob):
+        """Читает блоки прогресса, которые ffmpeg пишет в stdout (-progress)."""
+        data = job.process.readAllStandardOutput().data()
+        if self._was_stopped_manually:
+            # После остановки процесс может еще писать прогресс, пока
+            # завершается; буфер вычитываем, но в GUI ничего не отправляем
+            return
+        data = data.decode('ascii', errors='ignore')
+        data = job.progress_partial + data
+        # Неполная последняя строка дописывается к следующему блоку
+        complete_end = data.rfind('\n') + 1
+        job.progress_partial = data[complete_end:]
+        # Если в блоке данных несколько записей прогресса, разбираем только
+        # последнюю: предыдущие все равно устарели
+        last_fields = None
+        for key, value in _PROGRESS_FIELD_RE.findall(data, 0, complete_end):
+            if key != 'progress':
+                job.progress_fields[key] = value
                 continue
+            # Ключ progress (continue/end) завершает блок
+            last_fields, job.progress_fields = job.progress_fields, {}
+        if last_fields is not None:
+            self._update_job_progress(job, last_fields)
 
-            real_elapsed = self.calculate_real_elapsed()
-            _, percent, speed, fps, bitrate, eta, _ = parse_ffmpeg_output_for_progress(
-                line, self.current_file_duration
-            )
-            
-            # Накапливаем строку в общий лог
-            self._full_stderr_log.append(line)
+    def _update_job_progress(self, job: EncodeJob, fields: dict):
+        _, percent, speed, fps, bitrate, eta, _ = parse_ffmpeg_progress_block(
+            fields, job.duration
+        )
+        if percent is None:
+            return
 
-            if percent is not None:
-                try:
-                    current_speed = (
-                        float(speed.rstrip('x')) if speed != "N/A" else 0
-                    )
-                    queue_eta = self.calculate_queue_eta(
-                        percent, current_speed
-                    )
-                    if queue_eta:
-                        self.overall_progress.emit(
-                            self.current_file_index + 1,
-                            len(self.files_to_process),
-                            queue_eta
-                        )
-                except (ValueError, TypeError):
-                    pass
+        job.percent = percent
+        # Строку скорости формирует парсер: "N/A" или число с суффиксом x,
+        # поэтому перехват исключений не нужен
+        job.speed = float(speed[:-1]) if speed.endswith('x') else 0.0
 
-                time_str = (
-                    f"Прошло: {real_elapsed} | Осталось: {eta}"
-                    if real_elapsed and eta else ""
-                )
-                status_msg = (
-                    f"{self.files_to_process[self.current_file_index].name} "
-                    f"({percent}%) | {time_str} | Скорость: {speed} | "
-                    f"FPS: {fps} | Битрейт: {bitrate}"
-                )
-                self.progress.emit(percent, status_msg)
+        # Список файлов показывает целые проценты: повторять то же значение
+        # при каждом блоке -progress незачем
+        if percent != job.reported_percent:
+            job.reported_percent = percent
+            self.file_progress.emit(str(job.input_file), percent)
+        if not self._is_primary_job(job):
+            return
+
+        # Строка статуса собирается при отправке по таймеру: из блоков,
+        # пришедших за интервал, форматируется только последний
+        self._pending_progress = (job, percent, speed, fps, bitrate, eta)
+        if not self._progress_timer.isActive():
+            self._progress_timer.start()
+
+    def _flush_progress(self):
+        """Отправляет накопленное обновление прогресса по таймеру."""
+        if self._pending_progress is None or self._was_stopped_manually:
+            self._pending_progress = None
+            self._progress_timer.stop()
+            return
+        job, percent, speed, fps, bitrate, eta = self._pending_progress
+        self._pending_progress = None
+        self._update_queue_eta(job)
+
+        real_elapsed = self.calculate_real_elapsed(job.start_time)
+        status_msg = PROGRESS_STATUS_TEMPLATE.format(
+            name=job.name,
+            parallel=(
+                f" (+{len(self._jobs) - 1} в работе)"
+                if len(self._jobs) > 1 else ""
+            ),
+            percent=percent,
+            times=(
+                f"Прошло: {real_elapsed} | Осталось: {eta}"
+                if real_elapsed and eta else ""
+            ),
+            speed=speed, fps=fps, bitrate=bitrate
+        )
+        self.progress.emit(percent, status_msg)
+
+    def _update_queue_eta(self, job: EncodeJob):
+        """Пересчитывает время очереди, но не чаще QUEUE_ETA_INTERVAL_S."""
+        now = time.monotonic()
+        if now - self._last_queue_eta_ts < QUEUE_ETA_INTERVAL_S:
+            return
+        self._last_queue_eta_ts = now
+        # Для очереди учитываем прогресс и скорость всех активных файлов
+        active_jobs = self._jobs.values()
+        done_seconds = sum(
+            j.duration * j.percent / 100.0 for j in active_jobs
+        )
+        total_speed = sum(j.speed for j in active_jobs)
+        queue_eta = self.calculate_queue_eta(done_seconds, total_speed)
+        if queue_eta:
+            self.overall_progress.emit(
+                job.index + 1, len(self.files_to_process), queue_eta
+            )
+
+    def _emit_progress(self, percent: int, status_msg: str):
+        """Отправляет прогресс сразу, отбрасывая отложенное обновление."""
+        self._pending_progress = None
+        self.progress.emit(percent, status_msg)
 
+    @pyqtSlot()
     def stop(self):
+        """
+        Останавливает кодирование. QProcess и таймеры принадлежат потоку
+        кодировщика, поэтому из GUI метод вызывается через очередь событий
+        (QMetaObject.invokeMethod с QueuedConnection), а не напрямую.
+        """
         self._log("Получен запрос на остановку кодирования...", "warning")
         self._was_stopped_manually = True
         self._is_running = False
+        # Отложенное обновление прогресса после остановки уже не нужно.
+        # Таймер принадлежит потоку кодировщика: остановить его можно только
+        # здесь, поэтому GUI вызывает stop через очередь событий
+        self._progress_timer.stop()
+        self._pending_progress = None
+        self._analysis_stop.set()
 
-        if self._process.state() == QProcess.ProcessState.Running:
-            pid = self._process.processId()
-            self._log(
-                f"  Попытка остановить дерево процессов FFmpeg (PID: {pid})...",
-                "info"
-            )
+        for job in list(self._jobs.values()):
+            self._kill_job(job)
 
-            if platform.system() == "Windows":
-                try:
-                    kill_cmd = ['taskkill', '/F', '/T', '/PID', str(pid)]
-                    subprocess.run(
-                        kill_cmd, check=True, capture_output=True,
-                        creationflags=subprocess.CREATE_NO_WINDOW
-                    )
-                    self._log(
-                        f"  Команда taskkill для дерева PID {pid} выполнена.",
-                        "info"
-                    )
-                except (subprocess.CalledProcessError, FileNotFoundError) as e:
-                    self._log(
-                        f"  Ошибка taskkill: {e}. "
-                        "Возврат к стандартному QProcess.kill().",
-                        "error"
-                    )
-                    self._process.kill()
-            else:
+    def _kill_job(self, job: EncodeJob):
+        if job.process.state() == QProcess.ProcessState.Starting:
+            # stop доставляется через очередь событий и может прийти раньше
+            # подтверждения запуска: без ожидания такой ffmpeg не будет
+            # остановлен и закодирует файл до конца
+            if not job.process.waitForStarted(KILL_GRACE_MS):
+                job.process.kill()
+                return
+        if job.process.state() != QProcess.ProcessState.Running:
+            return
+        pid = job.process.processId()
+        self._log(
+            f"  Попытка остановить дерево процессов FFmpeg (PID: {pid})...",
+            "info"
+        )
+
+        if IS_WINDOWS:
+            try:
+                kill_cmd = ['taskkill', '/F', '/T', '/PID', str(pid)]
+                subprocess.run(
+                    kill_cmd, check=True, capture_output=True,
+                    creationflags=CREATIONFLAGS
+                )
                 self._log(
-                    "  Используем стандартный метод QProcess.kill() для Linux/macOS.",
+                    f"  Команда taskkill для дерева PID {pid} выполнена.",
+                    "info"
+                )
+            except (subprocess.CalledProcessError, FileNotFoundError) as e:
+                self._log(
+                    f"  Ошибка taskkill: {e}. "
+                    "Возврат к стандартному QProcess.kill().",
+                    "error"
+                )
+                job.process.kill()
+        else:
+            # ffmpeg запущен в отдельной сессии: останавливаем всю группу
+            # процессов, сначала SIGTERM, через KILL_GRACE_MS - SIGKILL
+            try:
+                pgid = os.getpgid(pid)
+                if pgid != pid:
+                    # Старый Qt без отдельной сессии: группа общая с GUI
+                    raise OSError("процесс не является лидером группы")
+                os.killpg(pgid, signal.SIGTERM)
+                self._log(
+                    f"  Группе процессов PID {pid} отправлен SIGTERM.",
                     "debug"
                 )
-                self._process.kill()
+                # Таймер принадлежит QProcess (stop выполняется в потоке
+                # кодировщика) и удаляется вместе с ним
+                kill_timer = QTimer(job.process)
+                kill_timer.setSingleShot(True)
+                kill_timer.timeout.connect(
+                    lambda job=job, pgid=pgid: self._force_kill_group(job, pgid)
+                )
+                kill_timer.start(KILL_GRACE_MS)
+            except (ProcessLookupError, PermissionError, OSError) as e:
+                self._log(
+                    f"  Ошибка killpg: {e}. "
+                    "Возврат к стандартному QProcess.kill().",
+                    "debug"
+                )
+                job.process.kill()
+
+    def _force_kill_group(self, job: EncodeJob, pgid: int):
+        # Задание уже завершено: QProcess мог быть удален, а группа с тем
+        # же номером - принадлежать другому процессу
+        if self._jobs.get(job.index) is not job:
+            return
+        if job.process.state() == QProcess.ProcessState.NotRunning:
+            return
+        try:
+            os.killpg(pgid, signal.SIGKILL)
+            self._log(
+                f"  Группа процессов PID {pgid} не завершилась после "
+                "SIGTERM, отправлен SIGKILL.",
+                "debug"
+            )
+        except OSError:
+            job.process.kill()
 
-    @pyqtSlot(int, QProcess.ExitStatus)
-    def on_process_finished(self, exit_code, exit_status):
-        current_file_name = self.files_to_process[self.current_file_index].name
+    def on_process_error(self, job: EncodeJob, error):
+        # Если ffmpeg не удалось запустить, сигнал finished не придет
+        if error == QProcess.ProcessError.FailedToStart:
+            job.stderr_log.append(
+                f"Не удалось запустить FFmpeg: {job.process.errorString()}"
+                .encode('utf-8')
+            )
+            self.on_process_finished(job, -1, QProcess.ExitStatus.CrashExit)
 
-        stderr_text = self._process.readAllStandardError().data().decode(
-            'utf-8', errors='ignore'
-        )
-        
-        # Если что-то осталось в буфере (последние байты), добавляем
-        if stderr_text:
-             for line in stderr_text.splitlines():
-                 if line:
-                     self._full_stderr_log.append(line)
+    def on_process_finished(self, job: EncodeJob, exit_code, exit_status):
+        if job.index not in self._jobs:
+            return
+        current_file_name = job.name
 
-        # Собираем полный текст из накопителя
-        full_stderr_text = "\n".join(self._full_stderr_log)
+        stderr_data = job.process.readAllStandardError().data()
 
+        # Если что-то осталось в буфере (последние байты), добавляем
+        lines, tail = split_chunk_lines(job.stderr_partial, stderr_data)
+        if tail:
+            lines.append(tail)
+        job.stderr_partial = b""
+        self._append_stderr_lines(job, lines)
+
+        move_failed = False
         if self._was_stopped_manually:
             self._log(f"  Кодирование {current_file_name} прервано.", "warning")
             self.file_processed.emit(
                 current_file_name, False, "Кодирование прервано"
             )
         elif exit_code == 0 and exit_status == QProcess.ExitStatus.NormalExit:
-            # --- ИЗМЕНЕНИЕ: Принудительно ставим прогресс 100% при успехе ---
-            self.progress.emit(
-                100, f"{current_file_name} (100%) | Завершено"
-            )
-
-            self._log(
-                f"  [УСПЕХ] Файл {current_file_name} успешно обработан.",
-                "info"
-            )
-            self.file_processed.emit(
-                current_file_name, True, "Успешно закодировано"
-            )
-            if self.current_file_duration:
-                self.processed_files_duration += self.current_file_duration
+            move_failed = not self._move_encoded_output(job)
+            if not move_failed:
+                self._report_file_success(job)
         else:
-            error_details = self.analyze_ffmpeg_stderr(full_stderr_text)
+            # Строки с известными ошибками идут первыми: они могли выпасть
+            # из хвоста, если после них ffmpeg вывел много предупреждений
+            error_details = self.analyze_ffmpeg_stderr(decode_stderr_lines(
+                [*job.error_lines.values(), *job.stderr_log]
+            ))
             self._log(
                 f"  [ОШИБКА] FFmpeg завершился с кодом {exit_code} "
                 f"для {current_file_name}.", "error"
             )
             self._log(f"    Причина: {error_details}", "error")
-            
+
             # --- ИЗМЕНЕНИЕ: Вывод полного лога FFmpeg в отладочный лог при ошибке ---
-            self._log(f"    --- Полный вывод FFmpeg (STDERR) ---", "debug")
-            # Разбьем на строки, чтобы не забивать лог одной гигантской строкой (если поддерживается)
-            # Или просто выведем кусками. Ограничим последние 50 строк для читаемости в GUI,
-            # но можно вывести всё.
-            # Пользователь просил вывод в терминал вывода ffmpeg при ошибке.
-            for line in self._full_stderr_log[-50:]: # Последние 50 строк
-                 self._log(f"    ffmpeg> {line}", "debug")
-            self._log(f"    --- Конец вывода FFmpeg ---", "debug")
+            if self._debug_enabled():
+                self._log(f"    --- Полный вывод FFmpeg (STDERR) ---", "debug")
+                # Разбьем на строки, чтобы не забивать лог одной гигантской строкой (если поддерживается)
+                # Или просто выведем кусками. Ограничим последние 50 строк для читаемости в GUI,
+                # но можно вывести всё.
+                # Пользователь просил вывод в терминал вывода ffmpeg при ошибке.
+                for line in decode_stderr_lines(list(job.stderr_log)[-50:]): # Последние 50 строк
+                     self._log(f"    ffmpeg> {line}", "debug")
+                self._log(f"    --- Конец вывода FFmpeg ---", "debug")
 
             self.file_processed.emit(
                 current_file_name, False, f"Ошибка FFmpeg: {error_details}"
             )
 
-        if exit_code != 0 or self._was_stopped_manually:
-            if self.current_output_file and self.current_output_file.exists():
+        if exit_code != 0 or self._was_stopped_manually or move_failed:
+            # Удаляем только то, что записал ffmpeg: при кодировании во
+            # временный файл существующий выходной файл не затронут.
+            # Без предварительной проверки exists(): отсутствие файла
+            # определяется по FileNotFoundError от самого unlink
+            if job.encode_output:
                 retry_attempts = 5
                 retry_delay_seconds = 0.2
                 for i in range(retry_attempts):
                     try:
-                        self.current_output_file.unlink()
+                        job.encode_output.unlink()
+                        self._set_output_exists(job.encode_output, False)
                         self._log(
                             f"    Удален неполный/ошибочный файл: "
-                            f"{self.current_output_file.name}",
+                            f"{job.encode_output.name}",
                             "info"
                         )
                         break
+                    except FileNotFoundError:
+                        self._set_output_exists(job.encode_output, False)
+                        break
                     except OSError as e:
                         if i < retry_attempts - 1:
                             self._log(
@@ -670,64 +1517,147 @@ class EncoderWorker(QObject):
                                 "error"
                             )
 
-        self.cleanup_after_file()
+        self._jobs.pop(job.index, None)
+        job.process.deleteLater()
+        self.cleanup_after_file(job)
         self.process_next_file()
 
-    def cleanup_after_file(self):
-        if self.current_temp_dir and self.current_temp_dir.exists():
-            try:
-                shutil.rmtree(self.current_temp_dir)
-            except Exception as e:
-                self._log(f"  Ошибка удаления временной папки: {e}", "error")
-        self.current_temp_dir = None
-        self.current_output_file = None
-        self.current_file_duration = 0
+    def _report_file_success(self, job: EncodeJob):
+        self.file_progress.emit(str(job.input_file), 100)
+        # --- ИЗМЕНЕНИЕ: Принудительно ставим прогресс 100% при успехе ---
+        if self._is_primary_job(job):
+            self._emit_progress(
+                100, f"{job.name} (100%) | Завершено"
+            )
+
+        self._log(
+            f"  [УСПЕХ] Файл {job.name} успешно обработан.",
+            "info"
+        )
+        self.file_processed.emit(
+            job.name, True, "Успешно закодировано"
+        )
+        if job.duration:
+            self.processed_files_duration += job.duration
+        self._set_output_exists(job.output_file, True)
+
+    def _move_encoded_output(self, job: EncodeJob) -> bool:
+        """
+        Перемещает результат из временного файла в папку вывода.
+        Возвращает False, если переместить не удалось (ошибка уже сообщена).
+        """
+        if job.encode_output == job.output_file:
+            return True
+        try:
+            job.output_file.unlink(missing_ok=True)
+            shutil.move(job.encode_output, job.output_file)
+        except OSError as e:
+            self._log(
+                f"  [ОШИБКА] Не удалось переместить {job.output_file.name} "
+                f"в папку вывода: {e}", "error"
+            )
+            self.file_processed.emit(
+                job.name, False,
+                f"Ошибка перемещения в папку вывода: {e}"
+            )
+            return False
+        return True
+
+    def cleanup_after_file(self, job: EncodeJob):
+        if job.holds_nvenc_slot:
+            self._nvenc_sem.release()
+            job.holds_nvenc_slot = False
+        if job.temp_dir is not None:
+            if self._cleanup_pool is None:
+                self._cleanup_pool = ThreadPoolExecutor(
+                    max_workers=1, thread_name_prefix="EncoderTmpClean"
+                )
+            self._cleanup_pool.submit(remove_temp_dir, job.temp_dir)
+        job.temp_dir = None
+
+    def _wait_for_cleanup(self):
+        if self._cleanup_pool is not None:
+            self._cleanup_pool.shutdown(wait=True)
+            self._cleanup_pool = None
+
+    def cleanup_session_temp_root(self):
+        if self._session_temp_root is None:
+            return
+        try:
+            shutil.rmtree(self._session_temp_root)
+        except Exception as e:
+            self._log(f"Ошибка удаления временной папки сессии: {e}", "error")
+        self._session_temp_root = None
 
     def finish_all_processing(self):
+        self._progress_timer.stop()
+        self._pending_progress = None
+        self._shutdown_prefetch()
+        try:
+            save_probe_cache()
+        except OSError as e:
+            self._log(f"Не удалось сохранить кэш анализа файлов: {e}", "warning")
+        self._wait_for_cleanup()
+        self.cleanup_session_temp_root()
         if self._was_stopped_manually:
             self._log("\n--- Обработка прервана. ---", "warning")
         self.finished.emit(self._was_stopped_manually)
 
-    def analyze_ffmpeg_stderr(self, stderr_text: str) -> str:
+    def analyze_ffmpeg_stderr(self, stderr_output) -> str:
+        """
+        Определяет причину ошибки ffmpeg. stderr_output - текст stderr
+        или уже разбитые строки (хвост stderr из EncodeJob), чтобы не
+        склеивать и снова делить их на строки.
+        """
+        if isinstance(stderr_output, str):
+            stderr_text = stderr_output
+            raw_lines = stderr_text.split('\n')
+        else:
+            raw_lines = list(stderr_output)
+            stderr_text = "\n".join(raw_lines)
         if not stderr_text:
             return "Неизвестная ошибка (пустой stderr)"
-        if "Driver does not support the required nvenc API version" in stderr_text:
+        found = {
+            match.lastgroup for match in _ERROR_UNION_RE.finditer(stderr_text)
+        }
+        if 'nvenc_driver' in found:
+            match = _NVENC_DRIVER_RE.search(stderr_text)
+            if match:
+                return (
+                    "Несовместимая версия драйвера NVIDIA. Требуется версия "
+                    f"{match.group(1)} или новее. Обновите драйверы."
+                )
             return "Несовместимая версия драйвера NVIDIA. Обновите драйверы."
-        if "No space left on device" in stderr_text:
+        if 'no_space' in found:
             return "Закончилось место на диске."
-        if "[libass]" in stderr_text or "fontconfig" in stderr_text.lower():
-            if "Font not found" in stderr_text:
+        if 'libass' in found:
+            if 'font_not_found' in found:
                 return "Ошибка субтитров: Шрифт не найден."
             return "Ошибка при обработке субтитров (libass/fontconfig)."
-        if "No such file or directory" in stderr_text:
+        if 'no_such_file' in found:
+            match = _NO_SUCH_FILE_RE.search(stderr_text)
+            if match:
+                return (
+                    "Файл или папка не найдены (No such file or directory): "
+                    f"{match.group(1).strip()}"
+                )
             return "Файл или папка не найдены (No such file or directory)."
-        if "Permission denied" in stderr_text:
+        if 'permission_denied' in found:
+            match = _PERM_DENIED_RE.search(stderr_text)
+            if match:
+                return (
+                    "Отказано в доступе (Permission denied): "
+                    f"{match.group(1).strip()}"
+                )
             return "Отказано в доступе (Permission denied)."
-        if "Unrecognized option" in stderr_text or "Option not found" in stderr_text:
-             return "Неизвестная опция FFmpeg (возможно, опечатка в коде команды)."
-        if "Invalid argument" in stderr_text:
-            return "Неверный аргумент команды FFmpeg (Invalid argument)."
-        if "At least one output file must be specified" in stderr_text:
-            return "Не указан выходной файл (внутренняя ошибка сборки команды)."
-        if "Error initializing filters" in stderr_text:
-            return "Ошибка инициализации фильтров (возможно, неверные параметры кропа или разрешения)."
-        if "moov atom not found" in stderr_text:
-            return "Поврежденный входной файл (moov atom not found)."
-        if "Conversion failed" in stderr_text:
-            return "Конвертация не удалась (Conversion failed)."
-
-        lines = [
-            line.strip() for line in stderr_text.strip().split('\n')
-            if line.strip()
-        ]
-        error_keywords = [
-            'error', 'failed', 'invalid', 'could not', 'unable', 'cannot',
-            'unrecognized'
-        ]
+        for name, message in _SIMPLE_ERROR_MESSAGES.items():
+            if name in found:
+                return message
+
+        lines = [line for line in map(str.strip, raw_lines) if line]
         last_error_line_index = -1
         for i in range(len(lines) - 1, -1, -1):
-            line_lower = lines[i].lower()
-            if any(keyword in line_lower for keyword in error_keywords):
+            if _ERROR_LINE_RE.search(lines[i]):
                 last_error_line_index = i
                 break
         if last_error_line_index != -1:
@@ -737,8 +1667,7 @@ class EncoderWorker(QObject):
 
         meaningful_lines = []
         for line in reversed(lines):
-            if ('frame=' not in line and 'fps=' not in line and
-                    'speed=' not in line):
+            if not _PROGRESS_LINE_RE.search(line):
                 meaningful_lines.append(line)
                 if len(meaningful_lines) >= 4:
                     break
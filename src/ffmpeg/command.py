@@ -22,7 +22,15 @@ def build_ffmpeg_command(
     if not FFMPEG_PATH.is_file():
         raise FileNotFoundError(f"FFmpeg не найден: {FFMPEG_PATH}")
 
-    command = [str(FFMPEG_PATH), '-y', '-hide_banner', '-loglevel', 'info']
+    # Прогресс идет в stdout машиночитаемыми блоками ключ=значение,
+    # а в stderr остаются только предупреждения и ошибки
+    command = [
+        str(FFMPEG_PATH), '-y', '-hide_banner', '-nostats',
+        '-loglevel', 'warning', '-progress', 'pipe:1'
+    ]
+    # Ограничения потоков CPU при нескольких одновременных кодированиях
+    if enc_settings.get('filter_threads'):
+        command.extend(['-filter_threads', str(enc_settings['filter_threads'])])
 
     # Определяем целевые форматы пикселей для CPU и GPU
     is_10bit = enc_settings.get('force_10bit_output', False)
@@ -48,6 +56,9 @@ def build_ffmpeg_command(
     if use_hw_decoder:
         command.extend(['-c:v', explicit_decoder])
         decoder_name = explicit_decoder
+    elif enc_settings.get('decode_threads'):
+        # Потоки программного декодера (опция входа)
+        command.extend(['-threads', str(enc_settings['decode_threads'])])
 
     command.extend(['-i', str(input_file)])
 
@@ -196,6 +207,10 @@ def build_ffmpeg_command(
         '-map_metadata', '-1',
         '-movflags', '+faststart',
         '-tag:v', 'hvc1',
+        # Пишем пакеты крупными блоками, а не после каждого кадра, и не
+        # останавливаем кодирование, если запись на медленный диск отстает
+        '-flush_packets', '0',
+        '-max_muxing_queue_size', '9999',
         str(output_file)
     ])
 
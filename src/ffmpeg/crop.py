@@ -1,102 +1,198 @@
-import platform
 import re
 import subprocess
+import threading
+import time
 from pathlib import Path
 
 from src.app_config import FFMPEG_PATH
+from src.ffmpeg.utils import CREATIONFLAGS
+
+# Если ключевых кадров на отрезке не хватило, cropdetect анализирует каждый
+# N-й кадр: черные полосы не меняются от кадра к кадру, а фильтр и
+# копирование кадров с GPU дешевле в N раз
+CROPDETECT_FRAME_STEP = 30
+# Как часто ожидание cropdetect проверяет запрос остановки
+CROPDETECT_POLL_INTERVAL_S = 0.2
+
+
+def _build_cropdetect_command(
+    filepath: Path,
+    duration_for_analysis_sec: float,
+    limit_value: int,
+    use_hwaccel: bool,
+    keyframes_only: bool
+) -> list[str]:
+    command = [str(FFMPEG_PATH), '-hide_banner', '-nostats', '-loglevel', 'info']
+    frame_filters = []
+    if keyframes_only:
+        # Декодер пропускает все кадры, кроме ключевых: черные полосы
+        # видны и на них, а декодировать нужно в десятки раз меньше
+        command.extend(['-skip_frame', 'nokey'])
+    else:
+        frame_filters.append(
+            f"select='not(mod(n\\,{CROPDETECT_FRAME_STEP}))'"
+        )
+    if use_hwaccel:
+        # Кадры декодируются на NVDEC и остаются в видеопамяти;
+        # в системную память копируются только отобранные кадры
+        command.extend(['-hwaccel', 'cuda', '-hwaccel_output_format', 'cuda'])
+        frame_filters.append('hwdownload,format=nv12|p010le')
+    frame_filters.append(f'cropdetect=limit={limit_value}:round=2:reset=0')
+    command.extend([
+        # -ss/-t как опции входа: читаем и декодируем только нужный отрезок
+        '-ss', '0',
+        '-t', str(duration_for_analysis_sec),
+        '-i', str(filepath),
+        '-an', '-sn', '-dn',
+        '-vf', ','.join(frame_filters),
+        '-f', 'null',
+        '-'
+    ])
+    return command
+
+
+def _run_cropdetect(
+    filepath: Path,
+    duration_for_analysis_sec: float,
+    limit_value: int,
+    use_hwaccel: bool,
+    stop_event: threading.Event | None = None
+) -> tuple[list[str] | None, bool]:
+    """
+    Запускает ffmpeg с фильтром cropdetect на начальном отрезке видео.
+    Сначала анализируются только ключевые кадры; если их на отрезке
+    слишком мало и результата нет - каждый N-й кадр.
+    Возвращает (значения crop=w:h:x:y, failed): список может быть пустым,
+    None - таймаут или остановка через stop_event. failed - ffmpeg
+    завершился с ошибкой, не найдя кроп (например, видео не декодируется
+    на GPU); второй проход в этом случае не запускается.
+    """
+    crop_detections = []
+    for keyframes_only in (True, False):
+        command = _build_cropdetect_command(
+            filepath, duration_for_analysis_sec, limit_value, use_hwaccel,
+            keyframes_only
+        )
+        process = subprocess.Popen(
+            command,
+            stderr=subprocess.PIPE,
+            stdout=subprocess.DEVNULL,
+            text=True,
+            encoding='utf-8',
+            errors='ignore',
+            creationflags=CREATIONFLAGS
+        )
+
+        # Ждем короткими интервалами, чтобы остановка кодирования
+        # завершала ffmpeg сразу, а не через таймаут
+        deadline = time.monotonic() + duration_for_analysis_sec + 5
+        while True:
+            try:
+                _, stderr_output = process.communicate(
+                    timeout=CROPDETECT_POLL_INTERVAL_S
+                )
+                break
+            except subprocess.TimeoutExpired:
+                stopped = stop_event is not None and stop_event.is_set()
+                if stopped or time.monotonic() >= deadline:
+                    process.kill()
+                    process.communicate()
+                    return None, False
+
+        crop_detections = re.findall(r'crop=(\d+:\d+:\d+:\d+)', stderr_output)
+        if crop_detections:
+            break
+        if process.returncode != 0:
+            return crop_detections, True
+    return crop_detections, False
 
 
 def get_crop_parameters(
     filepath: Path,
     log_callback,
     duration_for_analysis_sec: int = 20,
-    limit_value: int = 24
+    limit_value: int = 24,
+    source_size: tuple[int, int] | None = None,
+    use_hwaccel: bool = False,
+    stop_event: threading.Event | None = None
 ) -> str | None:
     """
     Анализирует видео с помощью cropdetect и возвращает строку параметров кропа.
 
     duration_for_analysis_sec: сколько секунд видео анализировать.
     limit_value: порог для cropdetect (0-255).
+    source_size: исходные (ширина, высота), если уже известны из ffprobe;
+    тогда отдельный запуск ffmpeg для их определения не нужен.
+    use_hwaccel: декодировать на GPU (-hwaccel cuda); если ffmpeg на GPU
+    завершился с ошибкой, анализ повторяется с декодированием на CPU.
+    stop_event: при его установке запущенный ffmpeg завершается.
     Возвращает строку типа "w:h:x:y" или None, если не удалось или обрезка не нужна.
     """
     if not FFMPEG_PATH.is_file():
         log_callback(f"FFmpeg не найден для cropdetect: {FFMPEG_PATH}", "error")
         return None
 
-    # Сначала получаем исходные размеры видео
     orig_width = orig_height = None
-    try:
-        probe_cmd = [
-            str(FFMPEG_PATH),
-            '-hide_banner',
-            '-i', str(filepath),
-        ]
-        creationflags = (subprocess.CREATE_NO_WINDOW
-                        if platform.system() == "Windows" else 0)
-
-        probe_process = subprocess.Popen(
-            probe_cmd,
-            stderr=subprocess.PIPE,
-            stdout=subprocess.DEVNULL,
-            text=True,
-            encoding='utf-8',
-            errors='ignore',
-            creationflags=creationflags
-        )
-        _, probe_stderr = probe_process.communicate()
-
-        # Исправленное регулярное выражение для поиска размеров видео
-        video_info = re.search(r'\s(\d+)x(\d+)[,\s]', probe_stderr)
-        if video_info:
-            orig_width, orig_height = map(int, video_info.groups())
-            log_callback(
-                f"    Исходный размер видео: {orig_width}x{orig_height}", "info"
+    if source_size:
+        orig_width, orig_height = source_size
+    else:
+        # Сначала получаем исходные размеры видео
+        try:
+            probe_cmd = [
+                str(FFMPEG_PATH),
+                '-hide_banner',
+                '-i', str(filepath),
+            ]
+
+            probe_process = subprocess.Popen(
+                probe_cmd,
+                stderr=subprocess.PIPE,
+                stdout=subprocess.DEVNULL,
+                text=True,
+                encoding='utf-8',
+                errors='ignore',
+                creationflags=CREATIONFLAGS
             )
-    except Exception as e:
-        log_callback(f"    Ошибка при получении размеров видео: {e}", "warning")
-        return None
+            _, probe_stderr = probe_process.communicate()
+
+            # Исправленное регулярное выражение для поиска размеров видео
+            video_info = re.search(r'\s(\d+)x(\d+)[,\s]', probe_stderr)
+            if video_info:
+                orig_width, orig_height = map(int, video_info.groups())
+                log_callback(
+                    f"    Исходный размер видео: {orig_width}x{orig_height}", "info"
+                )
+        except Exception as e:
+            log_callback(f"    Ошибка при получении размеров видео: {e}", "warning")
+            return None
 
     if not (orig_width and orig_height):
         log_callback("    Не удалось определить исходные размеры видео", "error")
         return None
 
-    # Теперь запускаем cropdetect
-    command = [
-        str(FFMPEG_PATH),
-        '-hide_banner', '-loglevel', 'info',
-        '-i', str(filepath),
-        '-t', str(duration_for_analysis_sec),
-        '-vf', f'cropdetect=limit={limit_value}:round=2:reset=0',
-        '-f', 'null',
-        '-'
-    ]
-
     try:
-        creationflags = (subprocess.CREATE_NO_WINDOW
-                        if platform.system() == "Windows" else 0)
-        process = subprocess.Popen(
-            command,
-            stderr=subprocess.PIPE,
-            stdout=subprocess.DEVNULL,
-            text=True,
-            encoding='utf-8',
-            errors='ignore',
-            creationflags=creationflags
+        crop_detections, failed = _run_cropdetect(
+            filepath, duration_for_analysis_sec, limit_value, use_hwaccel,
+            stop_event
         )
-
-        try:
-            _, stderr_output = process.communicate(
-                timeout=duration_for_analysis_sec + 5
+        # Повтор на CPU только при ошибке ffmpeg: если декодирование на GPU
+        # прошло, но кроп не найден, на CPU результат будет тем же
+        if use_hwaccel and failed:
+            log_callback(
+                "    cropdetect на GPU завершился с ошибкой, повтор на CPU",
+                "debug"
+            )
+            crop_detections, _ = _run_cropdetect(
+                filepath, duration_for_analysis_sec, limit_value, False,
+                stop_event
             )
-        except subprocess.TimeoutExpired:
-            process.kill()
-            _, stderr_output = process.communicate()
+        if stop_event is not None and stop_event.is_set():
+            log_callback("    cropdetect прерван остановкой", "debug")
+            return None
+        if crop_detections is None:
             log_callback("    Таймаут при выполнении cropdetect", "error")
             return None
 
-        # Собираем все найденные параметры кропа
-        crop_detections = re.findall(r'crop=(\d+:\d+:\d+:\d+)', stderr_output)
-
         if crop_detections:
             crop_params_str = crop_detections[-1]
             crop_width, crop_height, crop_x, crop_y = map(
@@ -1,9 +1,12 @@
-import platform
 import shutil
 import subprocess
 
-from src.app_config import FFMPEG_PATH
+from src.app_config import (
+    FFMPEG_PATH, NVENC_DEFAULT_MAX_SESSIONS, NVENC_CONSUMER_MAX_SESSIONS,
+    NVENC_PRO_MAX_SESSIONS
+)
 from src.ffmpeg.core import check_executable
+from src.ffmpeg.utils import CREATIONFLAGS
 
 
 def verify_nvidia_gpu_presence() -> tuple[bool, str]:
@@ -14,8 +17,6 @@ def verify_nvidia_gpu_presence() -> tuple[bool, str]:
         return False, f"Команда '{nvidia_smi_cmd}' не найдена в системном PATH."
 
     try:
-        creationflags = (subprocess.CREATE_NO_WINDOW
-                        if platform.system() == "Windows" else 0)
         result = subprocess.run(
             [smi_path],
             capture_output=True,
@@ -23,7 +24,7 @@ def verify_nvidia_gpu_presence() -> tuple[bool, str]:
             check=False,
             encoding='utf-8',
             errors='ignore',
-            creationflags=creationflags
+            creationflags=CREATIONFLAGS
         )
 
         if result.returncode == 0:
@@ -39,6 +40,45 @@ def verify_nvidia_gpu_presence() -> tuple[bool, str]:
         return False, f"Ошибка выполнения '{nvidia_smi_cmd}': {e}"
 
 
+def get_nvidia_gpu_name() -> str | None:
+    """Возвращает название первого GPU NVIDIA по данным nvidia-smi."""
+    smi_path = shutil.which("nvidia-smi")
+    if smi_path is None:
+        return None
+    try:
+        result = subprocess.run(
+            [smi_path, '--query-gpu=name', '--format=csv,noheader'],
+            capture_output=True,
+            text=True,
+            check=False,
+            encoding='utf-8',
+            errors='ignore',
+            creationflags=CREATIONFLAGS,
+            timeout=10
+        )
+    except Exception:
+        return None
+    if result.returncode != 0 or not result.stdout:
+        return None
+    lines = result.stdout.strip().splitlines()
+    return lines[0].strip() if lines else None
+
+
+def get_max_nvenc_sessions(gpu_name: str | None) -> int:
+    """
+    Возвращает лимит одновременных сессий NVENC для модели GPU.
+    Потребительские карты (GeForce, TITAN) ограничены драйвером, остальные
+    профессиональные: их названия (RTX 4000 Ada, L40S, H100, RTX A4000...)
+    не имеют общего признака, поэтому определяются по отсутствию GeForce.
+    """
+    if not gpu_name:
+        return NVENC_DEFAULT_MAX_SESSIONS
+    name = gpu_name.lower()
+    if 'geforce' in name or 'titan' in name:
+        return NVENC_CONSUMER_MAX_SESSIONS
+    return NVENC_PRO_MAX_SESSIONS
+
+
 def detect_nvidia_hardware() -> tuple[dict | None, str]:
     """
     Определяет наличие NVIDIA GPU, поддерживаемых декодеров/энкодеров FFmpeg.
@@ -56,7 +96,8 @@ def detect_nvidia_hardware() -> tuple[dict | None, str]:
         'type': None,
         'decoder_map': {},
         'encoder': None,
-        'subtitles_filter': False
+        'subtitles_filter': False,
+        'max_nvenc_sessions': NVENC_DEFAULT_MAX_SESSIONS
     }
     # messages уже инициализирован выше
 
@@ -67,8 +108,6 @@ def detect_nvidia_hardware() -> tuple[dict | None, str]:
         return None, "\n".join(messages)
 
     try:
-        creationflags = (subprocess.CREATE_NO_WINDOW
-                        if platform.system() == "Windows" else 0)
 
         cmds = {
             "encoders": [str(FFMPEG_PATH), '-hide_banner', '-encoders'],
@@ -83,7 +122,7 @@ def detect_nvidia_hardware() -> tuple[dict | None, str]:
                 text=True,
                 encoding='utf-8',
                 errors='ignore',
-                creationflags=creationflags,
+                creationflags=CREATIONFLAGS,
                 check=True
             )
             # Приводим к нижнему регистру для надежного поиска
@@ -96,6 +135,13 @@ def detect_nvidia_hardware() -> tuple[dict | None, str]:
             messages.append(f"Энкодер FFmpeg '{nvidia_encoder}' найден.")
             hw_info['encoder'] = nvidia_encoder
             hw_info['type'] = 'nvidia'  # Подтверждаем тип, только если энкодер найден
+            gpu_name = get_nvidia_gpu_name() if gpu_ok else None
+            hw_info['max_nvenc_sessions'] = get_max_nvenc_sessions(gpu_name)
+            messages.append(
+                f"Лимит одновременных сессий NVENC: "
+                f"{hw_info['max_nvenc_sessions']} "
+                f"(GPU: {gpu_name or 'не определен'})."
+            )
 
         # Фильтр называется 'subtitles', а не 'libass' в списке filters
         if 'subtitles' in results["filters"]:
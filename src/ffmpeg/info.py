@@ -1,9 +1,9 @@
 import json
-import platform
 import subprocess
 from pathlib import Path
 
 from src.app_config import FFPROBE_PATH, SUBTITLE_TRACK_TITLE_KEYWORD
+from src.ffmpeg.utils import CREATIONFLAGS
 
 
 def get_video_resolution(filepath: Path) -> tuple[int | None, int | None, str | None]:
@@ -24,8 +24,6 @@ def get_video_resolution(filepath: Path) -> tuple[int | None, int | None, str |
         str(filepath)
     ]
     try:
-        creationflags = (subprocess.CREATE_NO_WINDOW
-                        if platform.system() == "Windows" else 0)
         result = subprocess.run(
             command,
             capture_output=True,
@@ -33,17 +31,15 @@ def get_video_resolution(filepath: Path) -> tuple[int | None, int | None, str |
             check=True,
             encoding='utf-8',
             errors='ignore',
-            creationflags=creationflags
+            creationflags=CREATIONFLAGS
         )
         resolution_str = result.stdout.strip()
         if 'x' in resolution_str:
             width_str, height_str = resolution_str.split('x')
             width = int(width_str)
             height = int(height_str)
-            if height % 2 != 0:
-                height -= 1
-            if width % 2 != 0:
-                width -= 1
+            height &= ~1
+            width &= ~1
             return width, height, None
         else:
             return (None, None,
@@ -78,7 +74,7 @@ def get_video_subtitle_attachment_info(filepath: Path) -> tuple[
     # Формируем аргумент show_entries отдельно для читаемости
     entries = (
         "format=duration:"
-        "stream=index,codec_name,codec_type,pix_fmt,width,height:"
+        "stream=index,codec_name,codec_type,pix_fmt,width,height,extradata_size:"
         "stream_tags=title,language,filename,mimetype"
     )
 
@@ -102,8 +98,6 @@ def get_video_subtitle_attachment_info(filepath: Path) -> tuple[
     )
 
     try:
-        creationflags = (subprocess.CREATE_NO_WINDOW
-                        if platform.system() == "Windows" else 0)
         result = subprocess.run(
             command,
             capture_output=True,
@@ -111,7 +105,7 @@ def get_video_subtitle_attachment_info(filepath: Path) -> tuple[
             check=True,
             encoding='utf-8',
             errors='ignore',
-            creationflags=creationflags
+            creationflags=CREATIONFLAGS
         )
         data = json.loads(result.stdout)
 
@@ -149,10 +143,8 @@ def get_video_subtitle_attachment_info(filepath: Path) -> tuple[
                     try:
                         width = int(width)
                         height = int(height)
-                        if width % 2 != 0:
-                            width -= 1
-                        if height % 2 != 0:
-                            height -= 1
+                        width &= ~1
+                        height &= ~1
                     except ValueError:
                         width, height = None, None
                 else:
@@ -179,7 +171,9 @@ def get_video_subtitle_attachment_info(filepath: Path) -> tuple[
                 if mimetype in font_mimetypes and filename:
                     font_attachments.append({
                         'index': stream_index,
-                        'filename': filename
+                        'filename': filename,
+                        # Данные вложения хранятся в extradata потока
+                        'size': stream.get('extradata_size')
                     })
 
         if not video_codec:
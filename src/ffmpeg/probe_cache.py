@@ -0,0 +1,142 @@
+import json
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+from src.app_config import APP_DIR, CACHE_SUBDIR, PROBE_CACHE_MAX_ENTRIES
+from src.ffmpeg.info import get_video_subtitle_attachment_info
+
+PROBE_CACHE_PATH = APP_DIR / CACHE_SUBDIR / "probe_cache.json"
+# Версия формата кэша. Увеличивать при изменении кортежа, который
+# возвращает get_video_subtitle_attachment_info, или формата записей:
+# кэш другой версии (или без версии) отбрасывается целиком
+CACHE_VERSION = 2
+
+# Путь файла -> {'size', 'mtime_ns', 'info', 'crop'}; порядок - от давно
+# использованных к недавним (LRU)
+_cache = None
+_dirty = False
+_lock = threading.Lock()
+
+
+def _load_cache() -> OrderedDict:
+    global _cache
+    if _cache is None:
+        _cache = OrderedDict()
+        try:
+            with open(PROBE_CACHE_PATH, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            data = None
+        if (isinstance(data, dict) and
+                data.get('version') == CACHE_VERSION and
+                isinstance(data.get('entries'), dict)):
+            _cache.update(data['entries'])
+    return _cache
+
+
+def get_cached_video_info(
+    filepath: Path,
+    probe=get_video_subtitle_attachment_info
+) -> tuple:
+    """
+    То же, что probe (get_video_subtitle_attachment_info), но результат для
+    неизмененного файла (тот же размер и время изменения) берется из кэша
+    на диске без запуска ffprobe. Ошибки анализа не кэшируются.
+    """
+    global _dirty
+    try:
+        stat = os.stat(filepath)
+        key = os.path.normcase(os.path.abspath(filepath))
+    except OSError:
+        return probe(filepath)
+
+    with _lock:
+        entry = _load_cache().get(key)
+        if (entry and entry.get('size') == stat.st_size and
+                entry.get('mtime_ns') == stat.st_mtime_ns):
+            _cache.move_to_end(key)
+            return tuple(entry['info'])
+
+    info = probe(filepath)
+    if info[-1] is None:
+        with _lock:
+            cache = _load_cache()
+            cache[key] = {
+                'size': stat.st_size,
+                'mtime_ns': stat.st_mtime_ns,
+                'info': list(info)
+            }
+            cache.move_to_end(key)
+            while len(cache) > PROBE_CACHE_MAX_ENTRIES:
+                cache.popitem(last=False)
+            _dirty = True
+    return info
+
+
+def get_cached_crop(filepath: Path, params_key: str, detect) -> str | None:
+    """
+    Возвращает параметры кропа из кэша, а если их нет - результат detect()
+    (запуск cropdetect). Кроп хранится в записи ffprobe того же файла
+    отдельно для каждого набора параметров анализа (params_key), поэтому
+    при повторном кодировании неизмененного файла cropdetect не нужен.
+    Кэшируется только найденный кроп: None может означать и ошибку.
+    """
+    global _dirty
+    try:
+        stat = os.stat(filepath)
+        key = os.path.normcase(os.path.abspath(filepath))
+    except OSError:
+        return detect()
+
+    def matching_entry():
+        entry = _load_cache().get(key)
+        if (entry and entry.get('size') == stat.st_size and
+                entry.get('mtime_ns') == stat.st_mtime_ns):
+            return entry
+        return None
+
+    with _lock:
+        entry = matching_entry()
+        if entry and params_key in entry.get('crop', {}):
+            return entry['crop'][params_key]
+
+    crop = detect()
+    if crop:
+        with _lock:
+            # Запись создается при анализе ffprobe; без нее кроп не храним
+            entry = matching_entry()
+            if entry is not None:
+                entry.setdefault('crop', {})[params_key] = crop
+                _dirty = True
+    return crop
+
+
+def save_probe_cache():
+    """Записывает кэш на диск, если он изменился."""
+    global _dirty
+    with _lock:
+        if not _dirty or _cache is None:
+            return
+        PROBE_CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = PROBE_CACHE_PATH.with_suffix('.tmp')
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(
+                {'version': CACHE_VERSION, 'entries': _cache},
+                f, ensure_ascii=False
+            )
+        os.replace(temp_path, PROBE_CACHE_PATH)
+        _dirty = False
+
+
+def clear_probe_cache():
+    """Очищает кэш в памяти и удаляет его файл."""
+    global _cache, _dirty
+    with _lock:
+        _cache = OrderedDict()
+        _dirty = False
+        try:
+            PROBE_CACHE_PATH.unlink()
+        except FileNotFoundError:
+            pass
@@ -1,6 +1,3 @@
-import re
-
-
 def calculate_real_eta(
     current_time: float,
     total_duration: float,
@@ -19,62 +16,71 @@ def calculate_real_eta(
     return f"{eta_h:02d}:{eta_m:02d}:{eta_s:02d}"
 
 
-def parse_ffmpeg_output_for_progress(
-    line: str,
+def parse_ffmpeg_progress_block(
+    fields: dict,
     total_duration: float | None
 ) -> tuple[float | None, int | None, str, str, str, str | None, str | None]:
     """
-    Парсит строку вывода ffmpeg для получения времени, скорости, fps,
-    битрейта и расчета прогресса.
+    Разбирает один блок ключ=значение, который ffmpeg пишет с опцией
+    `-progress` (out_time_us, fps, bitrate, speed, ..., progress).
 
     Возвращает:
     (current_time_seconds, progress_percent, speed, fps, bitrate, eta, elapsed).
     """
-    # Улучшенный regex для времени
-    time_match = re.search(
-        r'(?:^|[\s(\[])time=(\d{2}):(\d{2}):(\d{2})\.(\d{2})',
-        line
-    )
+    current_time_seconds = None
+    out_time_us = fields.get('out_time_us', 'N/A')
+    if out_time_us.lstrip('-').isdigit():
+        current_time_seconds = max(int(out_time_us), 0) / 1_000_000
+
+    speed = None
+    speed_value = fields.get('speed', 'N/A').strip().rstrip('x')
+    if speed_value and speed_value != 'N/A':
+        try:
+            speed = float(speed_value)
+        except ValueError:
+            speed = None
 
-    # Regex для speed, fps, bitrate
-    stats_match = re.search(
-        r'fps=\s*([\d\.]+)\s+'                        # FPS
-        r'q=\s*([-\d\.]+)\s+'                         # q (качество/QP)
-        r'.*?'                                        # Пропускаем промежуточные
-        r'bitrate=\s*([\d\.N/A]+\s*k?bits/s|N/A)\s+'  # Bitrate (м.б. N/A)
-        r'speed=\s*([\d\.]+)x',                       # Speed
-        line
+    fps_str = fields.get('fps', 'N/A').strip() or "N/A"
+    bitrate_str = fields.get('bitrate', 'N/A').strip() or "N/A"
+
+    return _build_progress_result(
+        current_time_seconds, total_duration, speed, fps_str, bitrate_str
     )
 
-    current_time_seconds = None
+
+def _build_progress_result(
+    current_time_seconds: float | None,
+    total_duration: float | None,
+    speed: float | None,
+    fps_str: str,
+    bitrate_str: str
+) -> tuple[float | None, int | None, str, str, str, str | None, str | None]:
+    """Рассчитывает процент, ETA и форматирует значения прогресса."""
     progress_percent = None
     speed_str = "N/A"
-    fps_str = "N/A"
-    bitrate_str = "N/A"
     eta_str = None
     elapsed_str = None
 
-    if time_match:
-        h, m, s, ms = map(int, time_match.groups())
-        current_time_seconds = h * 3600 + m * 60 + s + ms / 100
-
+    if current_time_seconds is not None:
+        total_seconds = int(current_time_seconds)
+        h, rem = divmod(total_seconds, 3600)
+        m, s = divmod(rem, 60)
         # Для elapsed используем текущее время обработки
         elapsed_str = f"{h:02d}:{m:02d}:{s:02d}"
 
         if total_duration and total_duration > 0:
+            # Множитель 100 / duration точнее (t / d) * 100 на границах
+            # процента: для t=1.4, d=5 дает 28, а не 27 из-за округления
             progress_percent = min(
                 100,
-                int((current_time_seconds / total_duration) * 100)
+                int(current_time_seconds * (100 / total_duration))
             )
 
-    if stats_match:
-        fps_str = stats_match.group(1)
-        bitrate_str = stats_match.group(3)
-        speed = float(stats_match.group(4))
+    if speed is not None:
         speed_str = f"{int(speed)}x" if speed == int(speed) else f"{speed}x"
 
         # При нулевой скорости или отсутствии длительности сбрасываем время
-        if speed <= 0 or not total_duration:
+        if speed <= 0 or not total_duration or current_time_seconds is None:
             eta_str = None
             elapsed_str = None
         else:
@@ -86,4 +92,4 @@ def parse_ffmpeg_output_for_progress(
             )
 
     return (current_time_seconds, progress_percent, speed_str, fps_str,
-            bitrate_str, eta_str, elapsed_str)
\ No newline at end of file
+            bitrate_str, eta_str, elapsed_str)
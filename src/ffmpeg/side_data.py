@@ -0,0 +1,174 @@
+import subprocess
+from pathlib import Path
+
+from src.app_config import FFMPEG_PATH
+from src.ffmpeg.subtitles import build_subtitle_temp_path, remove_specific_tags
+from src.ffmpeg.utils import CREATIONFLAGS
+
+
+def extract_fonts_and_subtitle(
+    input_file: Path,
+    attachments_info: list[dict],
+    fonts_dir: Path | None,
+    subtitle_info: dict | None,
+    temp_dir: Path,
+    log_callback,
+    remove_credits: bool = False
+) -> tuple[int, str | None]:
+    """
+    Извлекает шрифты и дорожку субтитров одним запуском FFmpeg.
+    Шрифты сохраняются через -dump_attachment:N, субтитры - через
+    -map 0:N по глобальному индексу потока, поэтому отдельный вызов
+    ffprobe для поиска порядкового номера s-потока не нужен.
+    Возвращает (количество извлеченных шрифтов, путь к .ass или None).
+    """
+    fonts_to_extract = []
+    for item_info in attachments_info or []:
+        item_index = item_info.get('index')
+        item_filename = item_info.get('filename')
+        if item_index is None or not item_filename:
+            log_callback(
+                f"  Пропуск вложения: неполная информация (индекс: {item_index}, имя: {item_filename}).",
+                "warning"
+            )
+            continue
+        fonts_to_extract.append(
+            (item_index, item_filename, fonts_dir / Path(item_filename).name)
+        )
+
+    subtitle_index = subtitle_info.get('index') if subtitle_info else None
+    if subtitle_info and subtitle_index is None:
+        log_callback(
+            "  Ошибка извлечения субтитров: не указан индекс потока.", "error"
+        )
+
+    if not fonts_to_extract and subtitle_index is None:
+        return 0, None
+
+    if not FFMPEG_PATH.is_file():
+        log_callback(
+            f"  FFmpeg не найден для извлечения шрифтов и субтитров: {FFMPEG_PATH}",
+            "error"
+        )
+        return 0, None
+
+    command = [str(FFMPEG_PATH), '-y', '-hide_banner', '-loglevel', 'error']
+    for item_index, _, output_font_path in fonts_to_extract:
+        command.extend([f'-dump_attachment:{item_index}', str(output_font_path)])
+    command.extend(['-i', str(input_file)])
+
+    subtitle_temp_file_path = None
+    subtitle_title = 'untitled_subs'
+    if subtitle_index is not None:
+        subtitle_title = subtitle_info.get('title', 'untitled_subs')
+        subtitle_temp_file_path = build_subtitle_temp_path(temp_dir, subtitle_title)
+        command.extend([
+            '-map', f'0:{subtitle_index}',
+            '-c:s', 'ass',
+            str(subtitle_temp_file_path)
+        ])
+        log_callback(
+            f"  Извлечение субтитров (глоб. индекс {subtitle_index}, "
+            f"название '{subtitle_title}') в '{subtitle_temp_file_path.name}'",
+            "info"
+        )
+    if fonts_to_extract:
+        log_callback(
+            f"  Извлечение шрифтов ({len(fonts_to_extract)} шт.) в '{fonts_dir}'",
+            "debug"
+        )
+
+    # Вложения сохраняются до чтения потоков, поэтому для одних шрифтов
+    # хватает короткого таймаута. Субтитры требуют прочитать весь файл,
+    # что для большого MKV на сетевом диске может занять сколько угодно
+    # времени, поэтому с субтитрами таймаута нет (как при отдельном
+    # извлечении дорожки)
+    timeout_seconds = 60 if subtitle_temp_file_path is None else None
+    stderr_text = ""
+    run_failed = False
+    try:
+        # Код возврата не проверяем: без выходного файла (только шрифты)
+        # ffmpeg завершается с ошибкой, уже сохранив вложения
+        result = subprocess.run(
+            command,
+            capture_output=True,
+            text=True,
+            encoding='utf-8',
+            errors='ignore',
+            creationflags=CREATIONFLAGS,
+            timeout=timeout_seconds,
+            check=False
+        )
+        stderr_text = result.stderr.strip() if result.stderr else ""
+    except subprocess.TimeoutExpired:
+        run_failed = True
+        log_callback(
+            f"    Таймаут ({timeout_seconds}с) при извлечении шрифтов и субтитров.",
+            "error"
+        )
+    except Exception as e:
+        run_failed = True
+        log_callback(
+            f"    Неожиданная ошибка извлечения шрифтов и субтитров: {e}",
+            "error"
+        )
+
+    extracted_count = 0
+    for item_index, item_filename, output_font_path in fonts_to_extract:
+        if output_font_path.is_file() and output_font_path.stat().st_size > 0:
+            extracted_count += 1
+            continue
+        log_callback(
+            f"    Ошибка извлечения шрифта '{item_filename}' (поток #{item_index}).",
+            "error"
+        )
+        # Удаляем ошибочный/пустой файл
+        try:
+            output_font_path.unlink(missing_ok=True)
+        except OSError:
+            pass
+
+    if extracted_count > 0:
+        log_callback(
+            f"  Всего извлечено шрифтов: {extracted_count} из {len(fonts_to_extract)}",
+            "info"
+        )
+    elif fonts_to_extract:
+        log_callback(
+            f"  Не удалось извлечь ни одного шрифта из {len(fonts_to_extract)}.",
+            "warning"
+        )
+
+    subtitle_result = None
+    if subtitle_temp_file_path is not None and run_failed:
+        # ffmpeg прерван: файл субтитров может быть обрезан, вшивать
+        # неполные субтитры нельзя
+        subtitle_temp_file_path.unlink(missing_ok=True)
+        log_callback(
+            f"    Субтитры '{subtitle_title}' не извлечены: запуск FFmpeg "
+            "прерван, неполный файл удален.", "error"
+        )
+    elif subtitle_temp_file_path is not None:
+        if (subtitle_temp_file_path.is_file() and
+                subtitle_temp_file_path.stat().st_size > 0):
+            log_callback(
+                f"    Субтитры '{subtitle_title}' успешно извлечены и "
+                "сохранены как ASS.", "info"
+            )
+            if remove_credits:
+                remove_specific_tags(subtitle_temp_file_path, log_callback)
+            subtitle_result = str(subtitle_temp_file_path)
+        else:
+            log_callback(
+                f"    Ошибка извлечения субтитров '{subtitle_title}': "
+                "файл не создан или пуст.", "error"
+            )
+
+    subtitle_failed = (
+        subtitle_temp_file_path is not None and subtitle_result is None
+    )
+    if stderr_text and (subtitle_failed or
+                        extracted_count < len(fonts_to_extract)):
+        log_callback(f"    FFmpeg stderr: {stderr_text[-300:]}", "debug")
+
+    return extracted_count, subtitle_result
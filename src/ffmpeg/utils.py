@@ -1,6 +1,17 @@
 
+import ctypes
+import os
 import re
 import platform
+import subprocess
+from pathlib import Path
+
+# Тип диска GetDriveTypeW для сетевых дисков
+DRIVE_REMOTE = 4
+# ОС не меняется во время работы: определяем один раз при импорте
+IS_WINDOWS = platform.system() == "Windows"
+# Флаги запуска ffmpeg/ffprobe: без окна консоли на Windows
+CREATIONFLAGS = subprocess.CREATE_NO_WINDOW if IS_WINDOWS else 0
 
 def sanitize_filename_part(text: str, max_length: int = 50) -> str:
     """Очищает строку для использования в качестве части имени файла."""
@@ -71,4 +82,23 @@ def escape_ffmpeg_path(path_str: str) -> str:
     # ` -> \` (по запросу пользователя для надежности)
     escaped = escaped.replace("`", "\\`")
     
-    return escaped
\ No newline at end of file
+    return escaped
+
+
+def is_network_path(path: Path) -> bool:
+    """
+    Проверяет, находится ли путь на сетевом ресурсе Windows
+    (UNC-путь или подключенный сетевой диск).
+    """
+    if not IS_WINDOWS:
+        return False
+    path_str = os.path.abspath(path)
+    if path_str.startswith('\\\\'):
+        return True
+    drive = os.path.splitdrive(path_str)[0]
+    if not drive:
+        return False
+    try:
+        return ctypes.windll.kernel32.GetDriveTypeW(drive + '\\') == DRIVE_REMOTE
+    except (AttributeError, OSError):
+        return False
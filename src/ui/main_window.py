@@ -1,10 +1,11 @@
 import os
 import platform
+import re
 import subprocess
 from pathlib import Path
 
 from PyQt6.QtCore import (
-    Qt, QThread, QCoreApplication, QUrl, pyqtSlot, QSize
+    Qt, QThread, QCoreApplication, QUrl, pyqtSlot, QSize, QMetaObject
 )
 from PyQt6.QtGui import (
     QPalette, QColor, QTextCursor, QIcon,
@@ -15,7 +16,7 @@ from PyQt6.QtWidgets import (
     QTextEdit, QAbstractItemView,
     QFileDialog, QMessageBox,
     QScrollArea,
-    QInputDialog, QStackedWidget,
+    QStackedWidget, QDialog, QDialogButtonBox,
     QSystemTrayIcon, QApplication
 )
 
@@ -39,6 +40,20 @@ from src.encoding.encoder_worker import EncoderWorker
 from src.ffmpeg.core import check_executable
 from src.ffmpeg.detection import detect_nvidia_hardware
 from src.ffmpeg.info import get_video_resolution
+from src.ffmpeg.probe_cache import clear_probe_cache
+
+# Классификация строк отчета detect_nvidia_hardware по уровню лога.
+# Уровень определяет самое левое совпадение в строке.
+_HW_MSG_LEVEL_RE = re.compile(
+    r"ошибка|предупреждение|не найден фильтр субтитров|не найден",
+    re.IGNORECASE
+)
+_HW_MSG_LEVELS = {
+    "ошибка": "error",
+    "не найден": "error",
+    "предупреждение": "warning",
+    "не найден фильтр субтитров": "warning",
+}
 
 class FileListWidget(ListWidget):
     def paintEvent(self, event):
@@ -89,9 +104,15 @@ class MainWindow(FluentWindow):
 
         self.processed_files_count = 0
         self.hw_info = None
-        self.encoder_thread = None
+        # Поток кодирования создается один раз и переиспользуется
+        # между сессиями, вместо нового QThread на каждый запуск
+        self.encoder_thread = QThread()
+        self.encoder_thread.setObjectName("EncoderThread")
+        self.encoder_thread.start()
         self.encoder_worker = None
         self.files_to_process = []
+        # Путь файла -> строка в списке файлов на время кодирования
+        self._file_rows = {}
         self.output_directory = APP_DIR / OUTPUT_SUBDIR
         self.current_source_width = None
         self.current_source_height = None
@@ -192,6 +213,15 @@ class MainWindow(FluentWindow):
         else:
             self.log_message("Файлы уже присутствуют в списке.", "warning")
 
+    def on_clear_probe_cache(self):
+        """Удаляет кэш результатов ffprobe."""
+        try:
+            clear_probe_cache()
+        except OSError as e:
+            self.log_message(f"Не удалось удалить кэш анализа: {e}", "error")
+            return
+        self.log_message("Кэш анализа файлов очищен.", "info")
+
     def clear_file_list(self):
         """Очищает список файлов для обработки."""
         if not self.files_to_process:
@@ -278,6 +308,14 @@ class MainWindow(FluentWindow):
         self.btn_clear_files.setToolTip("Удалить все файлы из списка обработки.")
         self.btn_clear_files.clicked.connect(self.clear_file_list)
         files_buttons_layout.addWidget(self.btn_clear_files)
+
+        self.btn_clear_probe_cache = PushButton("Сбросить кэш анализа", self, FluentIcon.SYNC)
+        self.btn_clear_probe_cache.setToolTip(
+            "Удалить сохраненные результаты ffprobe. Обычно не нужно: "
+            "измененные файлы анализируются заново автоматически."
+        )
+        self.btn_clear_probe_cache.clicked.connect(self.on_clear_probe_cache)
+        files_buttons_layout.addWidget(self.btn_clear_probe_cache)
         
         files_buttons_layout.addStretch()
 
@@ -353,6 +391,21 @@ class MainWindow(FluentWindow):
         )
         layout_output.addWidget(self.chk_overwrite_existing)
 
+        parallel_layout = QHBoxLayout()
+        parallel_layout.setSpacing(10)
+        parallel_layout.addWidget(BodyLabel("Одновременных кодирований:"))
+        self.spin_parallel_jobs = SpinBox()
+        self.spin_parallel_jobs.setRange(1, 8)
+        self.spin_parallel_jobs.setValue(1)
+        self.spin_parallel_jobs.setToolTip(
+            "Сколько файлов кодировать одновременно.\n"
+            "По умолчанию для NVENC - не больше лимита сессий, определенного\n"
+            "по модели GPU; если драйвер допускает больше, значение можно увеличить."
+        )
+        parallel_layout.addWidget(self.spin_parallel_jobs)
+        parallel_layout.addStretch()
+        layout_output.addLayout(parallel_layout)
+
         settings_layout.addWidget(group_box_output)
         settings_layout.addStretch()  # Прижимает группу к верху
 
@@ -643,14 +696,18 @@ class MainWindow(FluentWindow):
         resolution_layout.setSpacing(16)
 
         self.chk_force_resolution = CheckBox("Принудительное разрешение:")
-        self.chk_force_resolution.stateChanged.connect(
-            self.toggle_resolution_options
-        )
         self.chk_force_resolution.setToolTip("Изменить разрешение выходного видео (скейлинг).")
         resolution_layout.addWidget(self.chk_force_resolution)
 
         self.combo_resolution = ComboBox()
         self.combo_resolution.setEnabled(False)
+        # Доступность списка связана с флажком напрямую, без Python-слота
+        self.chk_force_resolution.toggled.connect(
+            self.combo_resolution.setEnabled
+        )
+        self.chk_force_resolution.toggled.connect(
+            self.toggle_resolution_options
+        )
         self.combo_resolution.setToolTip("Выберите желаемое разрешение из списка.")
         resolution_layout.addWidget(self.combo_resolution)
         resolution_layout.addStretch()
@@ -1016,12 +1073,9 @@ class MainWindow(FluentWindow):
 
         self.hw_info, hw_msg = detect_nvidia_hardware()
         for line in hw_msg.split('\n'):
-            level = "info"
-            lower_line = line.lower()
-            if "ошибка" in lower_line or "не найден" in lower_line and "фильтр субтитров" not in lower_line:
-                level = "error"
-            elif "предупреждение" in lower_line or "не найден фильтр субтитров" in lower_line:
-                level = "warning"
+            match = _HW_MSG_LEVEL_RE.search(line)
+            level = (_HW_MSG_LEVELS[match.group(0).lower()]
+                     if match else "info")
             self.log_message(line, level)
 
         if self.hw_info is None or self.hw_info.get('encoder') is None:
@@ -1036,6 +1090,13 @@ class MainWindow(FluentWindow):
             self.toggle_encoder_settings() 
         else:
             self.log_message("Проверка NVIDIA и FFmpeg завершена.", "info")
+            # По умолчанию: половина ядер CPU, но не больше сессий NVENC.
+            # Лимит определяется по названию GPU и может быть ошибочным,
+            # поэтому диапазон не сужается: пользователь может его превысить
+            max_sessions = self.hw_info.get('max_nvenc_sessions', 1)
+            self.spin_parallel_jobs.setValue(
+                max(1, min((os.cpu_count() or 2) // 2, max_sessions))
+            )
             if not self.hw_info.get('subtitles_filter'):
                 self.log_message(
                     "Внимание: Фильтр субтитров не найден, вшивание субтитров "
@@ -1047,7 +1108,13 @@ class MainWindow(FluentWindow):
         self.validate_start_capability()
 
         fonts_dir_abs = (APP_DIR / FONTS_SUBDIR).resolve()
-        if fonts_dir_abs.is_dir() and list(fonts_dir_abs.glob('*')):
+        # Достаточно первой записи, весь каталог не перечисляем
+        try:
+            with os.scandir(fonts_dir_abs) as entries:
+                has_fonts = next(entries, None) is not None
+        except OSError:
+            has_fonts = False
+        if has_fonts:
             self.log_message(
                 f"Найдена папка с пользовательскими шрифтами: {fonts_dir_abs}",
                 "info"
@@ -1174,20 +1241,16 @@ class MainWindow(FluentWindow):
                 userData=(source_width, source_height)
             )
 
-    def toggle_resolution_options(self, state):
-        is_checked = (state == Qt.CheckState.Checked.value)
-        self.combo_resolution.setEnabled(is_checked)
-        if not is_checked:
-            if self.current_source_width and self.current_source_height:
-                for i in range(self.combo_resolution.count()):
-                    item_data = self.combo_resolution.itemData(i)
-                    source_res = (
-                        self.current_source_width,
-                        self.current_source_height
-                    )
-                    if item_data == source_res:
-                        self.combo_resolution.setCurrentIndex(i)
-                        break
+    def toggle_resolution_options(self, is_checked: bool):
+        """При снятии флажка возвращает выбор к исходному разрешению."""
+        if is_checked:
+            return
+        if self.current_source_width and self.current_source_height:
+            source_res = (self.current_source_width, self.current_source_height)
+            for i in range(self.combo_resolution.count()):
+                if self.combo_resolution.itemData(i) == source_res:
+                    self.combo_resolution.setCurrentIndex(i)
+                    break
 
     @pyqtSlot()
     def toggle_encoder_settings(self):
@@ -1293,6 +1356,11 @@ class MainWindow(FluentWindow):
 
     @pyqtSlot(list, str, result='QVariant')
     def prompt_for_subtitle_selection(self, available_tracks, filename):
+        """
+        Диалог выбора дорожки субтитров. Возвращает словарь: выбранная
+        дорожка ('track', None - не вшивать) и флаг 'apply_to_all' -
+        применять выбор к файлам с тем же набором дорожек без вопроса.
+        """
         dont_burn_text = "Не вшивать субтитры"
         items = [dont_burn_text]
         track_map = {}
@@ -1305,26 +1373,45 @@ class MainWindow(FluentWindow):
             items.append(item_text)
             track_map[item_text] = track
 
-        selected_item, ok = QInputDialog.getItem(
-            self,
-            "Выберите дорожку субтитров",
+        dialog = QDialog(self)
+        dialog.setWindowTitle("Выберите дорожку субтитров")
+        layout = QVBoxLayout(dialog)
+        label = BodyLabel(
             f"Для файла '{filename}' не найдены субтитры "
             f"'{SUBTITLE_TRACK_TITLE_KEYWORD}'.\n"
-            "Выберите другую дорожку для вшивания или отмените операцию.",
-            items,
-            0,
-            False
+            "Выберите другую дорожку для вшивания или отмените операцию."
+        )
+        label.setWordWrap(True)
+        layout.addWidget(label)
+        combo = ComboBox()
+        combo.addItems(items)
+        layout.addWidget(combo)
+        chk_apply_to_all = CheckBox(
+            "Применить ко всем файлам с такими же дорожками"
+        )
+        layout.addWidget(chk_apply_to_all)
+        buttons = QDialogButtonBox(
+            QDialogButtonBox.StandardButton.Ok |
+            QDialogButtonBox.StandardButton.Cancel
         )
+        buttons.accepted.connect(dialog.accept)
+        buttons.rejected.connect(dialog.reject)
+        layout.addWidget(buttons)
 
+        ok = dialog.exec() == QDialog.DialogCode.Accepted
+        selected_item = combo.currentText()
         if ok and selected_item and selected_item != dont_burn_text:
-            return track_map.get(selected_item)
+            chosen = track_map.get(selected_item)
         else:
-            return None
+            chosen = None
+        return {
+            'track': chosen,
+            'apply_to_all': ok and chk_apply_to_all.isChecked()
+        }
 
     def toggle_encoding(self):
-        if self.encoder_thread and self.encoder_thread.isRunning():
-            if self.encoder_worker:
-                self.encoder_worker.stop()
+        if self.encoder_worker is not None:
+            self.request_encoder_stop()
             self.btn_start_stop.setText("Остановка...")
             self.btn_start_stop.setEnabled(False)
         else:
@@ -1453,7 +1540,6 @@ class MainWindow(FluentWindow):
             self.processed_files_count = 0
             self.update_overall_progress_display()
 
-            self.encoder_thread = QThread()
             # Сбор настроек аудио
             audio_settings = {
                 'codec': self.combo_audio_codec.currentText(),
@@ -1479,7 +1565,8 @@ class MainWindow(FluentWindow):
                 overwrite_existing=self.chk_overwrite_existing.isChecked(),
                 audio_settings=audio_settings,
                 video_settings=video_settings, 
-                parent_gui=self
+                parent_gui=self,
+                max_parallel_jobs=self.spin_parallel_jobs.value()
             )
 
             self.encoder_worker.moveToThread(self.encoder_thread)
@@ -1492,15 +1579,21 @@ class MainWindow(FluentWindow):
             self.encoder_worker.overall_progress.connect(
                 self.update_overall_progress_label
             )
+            # При параллельном кодировании прогресс каждого файла
+            # показывается в списке файлов
+            self._file_rows = {
+                str(Path(f)): row for row, f in enumerate(self.files_to_process)
+            }
+            self.encoder_worker.file_progress.connect(
+                self.update_file_list_progress
+            )
             self.encoder_worker.finished.connect(self.on_encoding_finished)
 
-            self.encoder_thread.started.connect(self.encoder_worker.run)
-            self.encoder_thread.finished.connect(
-            self.encoder_thread.deleteLater
+            # Поток уже запущен, поэтому run ставится в его очередь событий
+            QMetaObject.invokeMethod(
+                self.encoder_worker, "run", Qt.ConnectionType.QueuedConnection
             )
 
-            self.encoder_thread.start()
-
             self.btn_start_stop.setText("Остановить кодирование")
             self.btn_start_stop.setIcon(FluentIcon.CLOSE)
             self.set_controls_enabled(False)
@@ -1533,6 +1626,19 @@ class MainWindow(FluentWindow):
         self.progress_bar_current_file.setValue(percentage)
         self.lbl_current_file_progress.setText(f"Файл: {status_text}")
 
+    def update_file_list_progress(self, file_path: str, percentage: int):
+        row = self._file_rows.get(file_path)
+        item = self.list_widget_files.item(row) if row is not None else None
+        if item is not None:
+            item.setText(f"{Path(file_path).name} — {percentage}%")
+
+    def reset_file_list_progress(self):
+        for file_path, row in self._file_rows.items():
+            item = self.list_widget_files.item(row)
+            if item is not None:
+                item.setText(Path(file_path).name)
+        self._file_rows = {}
+
     def update_overall_progress_display(self):
         total_files = len(self.files_to_process)
         if total_files > 0:
@@ -1581,19 +1687,13 @@ class MainWindow(FluentWindow):
 
         # Восстанавливаем UI в исходное состояние
         self.set_ui_for_encoding_state(False)
+        self.reset_file_list_progress()
         self.update_overall_progress_display()
 
-        # Безопасно завершаем и очищаем поток и рабочего
-        if self.encoder_thread:
-            self.encoder_thread.quit()  # Говорим потоку завершиться
-            # deleteLater() безопасно удалит объекты, когда это будет возможно
-            if self.encoder_worker:
-                self.encoder_worker.deleteLater()
-            self.encoder_thread.deleteLater()
-
-        # Обнуляем ссылки
+        # Поток остается жить для следующей сессии, удаляем только рабочего
+        if self.encoder_worker:
+            self.encoder_worker.deleteLater()
         self.encoder_worker = None
-        self.encoder_thread = None
 
         # Показываем сообщение только если работа завершилась штатно
         # Показываем сообщение только если работа завершилась штатно
@@ -1612,8 +1712,23 @@ class MainWindow(FluentWindow):
                 # Если трей не виден (не удалось инициализировать), пишем в статус бар или просто звук
                 pass
 
+    def request_encoder_stop(self):
+        """
+        Ставит остановку в очередь потока кодирования: процессы ffmpeg и
+        таймеры кодировщика можно трогать только из его потока.
+        """
+        QMetaObject.invokeMethod(
+            self.encoder_worker, "stop", Qt.ConnectionType.QueuedConnection
+        )
+
+    def shutdown_encoder_thread(self):
+        """Останавливает общий поток кодирования перед закрытием окна."""
+        if self.encoder_thread is not None and self.encoder_thread.isRunning():
+            self.encoder_thread.quit()
+            self.encoder_thread.wait(5000)
+
     def closeEvent(self, event):
-        if self.encoder_thread and self.encoder_thread.isRunning():
+        if self.encoder_worker is not None:
             reply = QMessageBox.question(
                 self,
                 "Кодирование в процессе",
@@ -1624,11 +1739,11 @@ class MainWindow(FluentWindow):
             )
 
             if reply == QMessageBox.StandardButton.Yes:
-                if self.encoder_worker:
-                    self.encoder_worker.stop()
-                # Не используем wait() здесь, чтобы не блокировать закрытие
+                self.request_encoder_stop()
+                self.shutdown_encoder_thread()
                 event.accept()
             else:
                 event.ignore()
         else:
+            self.shutdown_encoder_thread()
             event.accept()
\ No newline at end of file
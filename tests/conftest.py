@@ -41,6 +41,17 @@ def patch_qfluentwidgets_animations_session():
     except Exception:
         pass
 
+@pytest.fixture(autouse=True)
+def isolated_probe_cache(tmp_path, monkeypatch):
+    """Кэш ffprobe тестов пишется во временную папку, а не в APP_DIR."""
+    from collections import OrderedDict
+    import src.ffmpeg.probe_cache as probe_cache
+    monkeypatch.setattr(
+        probe_cache, "PROBE_CACHE_PATH", tmp_path / "cache" / "probe_cache.json"
+    )
+    monkeypatch.setattr(probe_cache, "_cache", OrderedDict())
+    monkeypatch.setattr(probe_cache, "_dirty", False)
+
 def process_pending_events():
     """Обрабатывает все ожидающие события Qt"""
     QApplication.processEvents()
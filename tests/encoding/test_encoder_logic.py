@@ -1,3 +1,5 @@
+import os
+import sys
 import pytest
 from unittest.mock import MagicMock, patch
 from pathlib import Path
@@ -25,6 +27,7 @@ def mock_encoder_worker(tmp_path):
         disable_subtitles=False,
         use_source_path=False,
         remove_credit_lines=False,
+        overwrite_existing=False,
         audio_settings={},
         video_settings={},
         parent_gui=MagicMock()
@@ -41,7 +44,7 @@ def test_process_next_file_success(mock_encoder_worker, mocker):
     m_build_cmd = mocker.patch("src.encoding.encoder_worker.build_ffmpeg_command")
     m_build_cmd.return_value = (["ffmpeg", "-i", "in"], "h264_cuvid", "hevc_nvenc")
     
-    m_process_start = mocker.patch.object(mock_encoder_worker._process, "start")
+    m_process_start = mocker.patch("src.encoding.encoder_worker.QProcess.start")
 
     # Run
     mock_encoder_worker.process_next_file()
@@ -49,7 +52,7 @@ def test_process_next_file_success(mock_encoder_worker, mocker):
     # Verify
     assert mock_encoder_worker.current_file_index == 0
     m_process_start.assert_called_once()
-    assert mock_encoder_worker.current_file_duration == 100.0
+    assert mock_encoder_worker._jobs[0].duration == 100.0
 
 def test_process_next_file_info_error(mock_encoder_worker, mocker):
     """Test handling of file info retrieval error."""
@@ -89,15 +92,36 @@ def test_process_next_file_exists_skip(mock_encoder_worker, mocker):
     # Mock get_info to pass the first check
     m_get_info = mocker.patch("src.encoding.encoder_worker.get_video_subtitle_attachment_info")
     m_get_info.return_value = (100.0, "h264", "yuv420p", 1920, 1080, None, [], [], None)
+    # После пропуска test1 запускается test2: ffmpeg для него не нужен
+    m_build_cmd = mocker.patch("src.encoding.encoder_worker.build_ffmpeg_command")
+    m_build_cmd.return_value = (["ffmpeg"], "dec", "enc")
+    mocker.patch("src.encoding.encoder_worker.QProcess.start")
 
     # Run
     mock_encoder_worker.process_next_file()
 
-    # Verify
+    # Verify: первым обработан пропущенный test1
     assert mock_slot.call_count > 0
-    args = mock_slot.call_args[0]
+    args = mock_slot.call_args_list[0][0]
     assert args[1] is True, f"Operation failed unexpectedly with message: {args[2]}"
     assert "существует" in args[2]
+    assert list(mock_encoder_worker._jobs) == [1]
+
+def test_existing_outputs_skipped_before_probe(mock_encoder_worker, mocker):
+    """Готовые файлы пропускаются без ffprobe и без временной папки."""
+    out_dir = mock_encoder_worker.global_output_directory
+    out_dir.mkdir(parents=True, exist_ok=True)
+    (out_dir / "test1.mp4").touch()
+    (out_dir / "test2.mp4").touch()
+    m_get_info = mocker.patch("src.encoding.encoder_worker.get_video_subtitle_attachment_info")
+    mock_slot = mocker.Mock()
+    mock_encoder_worker.file_processed.connect(mock_slot)
+
+    mock_encoder_worker.process_next_file()
+
+    assert mock_slot.call_count == 2
+    m_get_info.assert_not_called()
+    assert mock_encoder_worker._session_temp_root is None
 
 def test_audio_settings_passed_to_command(mock_encoder_worker, mocker):
     """Verify that audio settings are correctly passed to enc_settings."""
@@ -106,7 +130,7 @@ def test_audio_settings_passed_to_command(mock_encoder_worker, mocker):
     
     m_build_cmd = mocker.patch("src.encoding.encoder_worker.build_ffmpeg_command")
     m_build_cmd.return_value = (["ffmpeg"], "dec", "enc")
-    mocker.patch.object(mock_encoder_worker._process, "start")
+    mocker.patch("src.encoding.encoder_worker.QProcess.start")
     
     # Set specific audio settings
     mock_encoder_worker.audio_settings = {
@@ -130,3 +154,392 @@ def test_audio_settings_passed_to_command(mock_encoder_worker, mocker):
     assert enc_settings['audio_channels'] == '1'
     assert enc_settings['audio_track_title'] == 'My Audio'
     assert enc_settings['audio_track_language'] == 'jpn'
+
+def test_nvenc_slot_released_after_file(mock_encoder_worker, mocker):
+    """Слот сессии NVENC занимается на время кодирования и освобождается после файла."""
+    m_get_info = mocker.patch("src.encoding.encoder_worker.get_video_subtitle_attachment_info")
+    m_get_info.return_value = (100.0, "h264", "yuv420p", 1920, 1080, None, [], [], None)
+    m_build_cmd = mocker.patch("src.encoding.encoder_worker.build_ffmpeg_command")
+    m_build_cmd.return_value = (["ffmpeg"], "dec", "enc")
+    mocker.patch("src.encoding.encoder_worker.QProcess.start")
+
+    mock_encoder_worker.process_next_file()
+    job = mock_encoder_worker._jobs[0]
+    assert job.holds_nvenc_slot
+
+    mock_encoder_worker.cleanup_after_file(job)
+    assert not job.holds_nvenc_slot
+    # Семафор полностью освобожден: повторный release переполнил бы его
+    with pytest.raises(ValueError):
+        mock_encoder_worker._nvenc_sem.release()
+
+def test_parallel_jobs_above_detected_sessions(tmp_path, mocker):
+    """Число заданий, выбранное пользователем, превышает определенный лимит NVENC."""
+    files = [tmp_path / f"test{i}.mp4" for i in range(3)]
+    for f in files:
+        f.touch()
+    worker = EncoderWorker(
+        files_to_process=files, target_bitrate_mbps=4,
+        hw_info={'type': 'nvidia', 'encoder': 'hevc_nvenc',
+                 'subtitles_filter': True, 'max_nvenc_sessions': 2},
+        output_directory=tmp_path / "out", force_resolution=False,
+        selected_resolution_option=None, use_lossless_mode=False,
+        auto_crop_enabled=False, force_10bit_output=False,
+        disable_subtitles=False, use_source_path=False,
+        remove_credit_lines=False, overwrite_existing=False,
+        audio_settings={}, video_settings={}, parent_gui=MagicMock(),
+        max_parallel_jobs=3
+    )
+    m_get_info = mocker.patch("src.encoding.encoder_worker.get_video_subtitle_attachment_info")
+    m_get_info.return_value = (100.0, "h264", "yuv420p", 1920, 1080, None, [], [], None)
+    m_build_cmd = mocker.patch("src.encoding.encoder_worker.build_ffmpeg_command")
+    m_build_cmd.return_value = (["ffmpeg"], "dec", "enc")
+    m_start = mocker.patch("src.encoding.encoder_worker.QProcess.start")
+
+    worker.process_next_file()
+
+    assert m_start.call_count == 3
+
+def test_parallel_jobs_dispatch(mock_encoder_worker, mocker):
+    """При max_parallel_jobs=2 оба файла запускаются сразу, сессия завершается после последнего."""
+    from PyQt6.QtCore import QProcess
+
+    m_get_info = mocker.patch("src.encoding.encoder_worker.get_video_subtitle_attachment_info")
+    m_get_info.return_value = (100.0, "h264", "yuv420p", 1920, 1080, None, [], [], None)
+    m_build_cmd = mocker.patch("src.encoding.encoder_worker.build_ffmpeg_command")
+    m_build_cmd.return_value = (["ffmpeg"], "dec", "enc")
+    m_start = mocker.patch("src.encoding.encoder_worker.QProcess.start")
+
+    finished_slot = mocker.Mock()
+    processed_slot = mocker.Mock()
+    mock_encoder_worker.finished.connect(finished_slot)
+    mock_encoder_worker.file_processed.connect(processed_slot)
+    mock_encoder_worker.max_parallel_jobs = 2
+
+    mock_encoder_worker.process_next_file()
+    assert m_start.call_count == 2
+    assert sorted(mock_encoder_worker._jobs) == [0, 1]
+
+    first, second = mock_encoder_worker._jobs[0], mock_encoder_worker._jobs[1]
+    mock_encoder_worker.on_process_finished(second, 0, QProcess.ExitStatus.NormalExit)
+    assert list(mock_encoder_worker._jobs) == [0]
+    finished_slot.assert_not_called()
+
+    mock_encoder_worker.on_process_finished(first, 0, QProcess.ExitStatus.NormalExit)
+    assert not mock_encoder_worker._jobs
+    finished_slot.assert_called_once_with(False)
+    assert processed_slot.call_count == 2
+    assert mock_encoder_worker.processed_files_duration == 200.0
+
+def test_sync_start_failure_does_not_reenter_queue(mock_encoder_worker, mocker):
+    """Синхронная ошибка запуска ffmpeg не вызывает рекурсию и двойное завершение."""
+    from PyQt6.QtCore import QProcess
+    m_get_info = mocker.patch("src.encoding.encoder_worker.get_video_subtitle_attachment_info")
+    m_get_info.return_value = (100.0, "h264", "yuv420p", 1920, 1080, None, [], [], None)
+    m_build_cmd = mocker.patch("src.encoding.encoder_worker.build_ffmpeg_command")
+    m_build_cmd.return_value = (["ffmpeg"], "dec", "enc")
+    worker = mock_encoder_worker
+    starts = []
+
+    def failing_start(*args):
+        # Как QProcess.start на Windows: errorOccurred приходит внутри start
+        job = worker._jobs[worker.current_file_index]
+        starts.append(worker._scheduling)
+        worker.on_process_error(job, QProcess.ProcessError.FailedToStart)
+    mocker.patch("src.encoding.encoder_worker.QProcess.start", side_effect=failing_start)
+    finished_slot = mocker.Mock()
+    processed_slot = mocker.Mock()
+    worker.finished.connect(finished_slot)
+    worker.file_processed.connect(processed_slot)
+
+    worker.process_next_file()
+
+    # Оба файла запущены из одного внешнего цикла, а не рекурсивно
+    assert starts == [True, True]
+    assert processed_slot.call_count == 2
+    finished_slot.assert_called_once_with(False)
+    assert not worker._jobs
+
+@pytest.mark.skipif(sys.platform == "win32", reason="только POSIX")
+def test_stop_right_after_start_kills_starting_process(mock_encoder_worker, mocker, qtbot):
+    """Остановка сразу после запуска завершает ffmpeg, еще не подтвердивший запуск."""
+    from PyQt6.QtCore import QProcess
+    m_get_info = mocker.patch("src.encoding.encoder_worker.get_video_subtitle_attachment_info")
+    m_get_info.return_value = (100.0, "h264", "yuv420p", 1920, 1080, None, [], [], None)
+    m_build_cmd = mocker.patch("src.encoding.encoder_worker.build_ffmpeg_command")
+    m_build_cmd.return_value = (["sh", "-c", "sleep 30"], "dec", "enc")
+    worker = mock_encoder_worker
+    worker.files_to_process = worker.files_to_process[:1]
+    finished_slot = mocker.Mock()
+    worker.finished.connect(finished_slot)
+
+    worker.process_next_file()
+    job = worker._jobs[0]
+    assert job.process.state() == QProcess.ProcessState.Starting
+    worker.stop()
+
+    qtbot.waitUntil(lambda: finished_slot.called, timeout=5000)
+    finished_slot.assert_called_once_with(True)
+
+def test_heavy_file_encoded_without_parallel_jobs(mock_encoder_worker, mocker):
+    """Файл выше 1080p не запускается рядом с другими заданиями."""
+    from PyQt6.QtCore import QProcess
+
+    def get_info(path):
+        if path.name == "test1.mp4":
+            return (100.0, "hevc", "yuv420p", 3840, 2160, None, [], [], None)
+        return (100.0, "h264", "yuv420p", 1920, 1080, None, [], [], None)
+    mocker.patch("src.encoding.encoder_worker.get_video_subtitle_attachment_info",
+                 side_effect=get_info)
+    m_build_cmd = mocker.patch("src.encoding.encoder_worker.build_ffmpeg_command")
+    m_build_cmd.return_value = (["ffmpeg"], "dec", "enc")
+    m_start = mocker.patch("src.encoding.encoder_worker.QProcess.start")
+    mock_encoder_worker.max_parallel_jobs = 2
+
+    mock_encoder_worker.process_next_file()
+    assert list(mock_encoder_worker._jobs) == [0]
+    assert mock_encoder_worker._jobs[0].exclusive
+
+    mock_encoder_worker.on_process_finished(
+        mock_encoder_worker._jobs[0], 0, QProcess.ExitStatus.NormalExit
+    )
+    assert list(mock_encoder_worker._jobs) == [1]
+    assert m_start.call_count == 2
+    mock_encoder_worker.finish_all_processing()
+
+def test_session_temp_root_removed_on_finish(mock_encoder_worker, mocker):
+    """Папки файлов создаются внутри общей папки сессии, она удаляется в конце."""
+    m_get_info = mocker.patch("src.encoding.encoder_worker.get_video_subtitle_attachment_info")
+    m_get_info.return_value = (100.0, "h264", "yuv420p", 1920, 1080, None, [], [], None)
+    m_build_cmd = mocker.patch("src.encoding.encoder_worker.build_ffmpeg_command")
+    m_build_cmd.return_value = (["ffmpeg"], "dec", "enc")
+    mocker.patch("src.encoding.encoder_worker.QProcess.start")
+
+    mock_encoder_worker.process_next_file()
+    job = mock_encoder_worker._jobs[0]
+    session_root = mock_encoder_worker._session_temp_root
+    assert job.temp_dir.parent == session_root
+    assert job.temp_dir.name.startswith("f00000_")
+
+    mock_encoder_worker.finish_all_processing()
+    assert not session_root.exists()
+    assert mock_encoder_worker._session_temp_root is None
+
+def test_session_temp_root_in_configured_dir(mock_encoder_worker, mocker, tmp_path):
+    """Папка сессии создается в TRANSCODE_TEMP_DIR, если она задана."""
+    temp_dir = tmp_path / "fast" / "tmp"
+    mocker.patch("src.encoding.encoder_worker.TRANSCODE_TEMP_DIR", temp_dir)
+
+    session_root = mock_encoder_worker._get_session_temp_root()
+
+    assert session_root.parent == temp_dir
+    mock_encoder_worker.cleanup_session_temp_root()
+    assert not session_root.exists()
+
+def test_file_temp_dir_removed_in_background(mock_encoder_worker):
+    """Папка файла удаляется в фоне сразу после файла, до конца очереди."""
+    from src.encoding.encoder_worker import EncodeJob
+    session_root = mock_encoder_worker._get_session_temp_root()
+    job = EncodeJob(0, Path("a.mkv"))
+    job.temp_dir = session_root / "f00000_a"
+    job.temp_dir.mkdir()
+    (job.temp_dir / "subs.ass").write_text("x")
+
+    mock_encoder_worker.cleanup_after_file(job)
+    assert job.temp_dir is None
+    mock_encoder_worker._wait_for_cleanup()
+    assert not (session_root / "f00000_a").exists()
+    assert session_root.exists()
+    mock_encoder_worker.cleanup_session_temp_root()
+
+def test_remove_temp_dir_flat_and_nested(tmp_path):
+    """Плоская папка удаляется через scandir, вложенная - через rmtree."""
+    from src.encoding.encoder_worker import remove_temp_dir
+    flat = tmp_path / "flat"
+    flat.mkdir()
+    (flat / "subs.ass").write_text("x")
+    nested = tmp_path / "nested"
+    (nested / "extracted_fonts").mkdir(parents=True)
+    (nested / "extracted_fonts" / "Arial.ttf").write_bytes(b"f")
+    (nested / "subs.ass").write_text("x")
+
+    remove_temp_dir(flat)
+    remove_temp_dir(nested)
+    remove_temp_dir(tmp_path / "missing")
+
+    assert not flat.exists()
+    assert not nested.exists()
+
+def test_fonts_reused_from_session_cache(mock_encoder_worker, tmp_path):
+    """Шрифт, уже извлеченный для предыдущего файла, берется из кэша сессии."""
+    font = {'index': 4, 'filename': 'Arial.ttf', 'size': 4}
+    first_dir = tmp_path / "first"
+    first_dir.mkdir()
+    (first_dir / "Arial.ttf").write_bytes(b"font")
+    mock_encoder_worker._store_fonts_in_cache([font], first_dir)
+
+    second_dir = tmp_path / "second"
+    second_dir.mkdir()
+    other_font = {'index': 5, 'filename': 'Other.ttf', 'size': 10}
+    to_extract, reused = mock_encoder_worker._reuse_cached_fonts(
+        [font, other_font], second_dir
+    )
+
+    assert reused == 1
+    assert to_extract == [other_font]
+    assert (second_dir / "Arial.ttf").read_bytes() == b"font"
+    mock_encoder_worker.cleanup_session_temp_root()
+
+def test_output_exists_scans_directory_once(mock_encoder_worker, tmp_path, mocker):
+    """Содержимое папки вывода читается один раз, дальше проверка по множеству."""
+    out_dir = tmp_path / "out"
+    out_dir.mkdir()
+    (out_dir / "done.mp4").touch()
+    m_scandir = mocker.spy(os, "scandir")
+
+    assert mock_encoder_worker._output_exists(out_dir / "done.mp4")
+    assert not mock_encoder_worker._output_exists(out_dir / "new.mp4")
+    mock_encoder_worker._set_output_exists(out_dir / "new.mp4", True)
+    assert mock_encoder_worker._output_exists(out_dir / "new.mp4")
+    assert m_scandir.call_count == 1
+
+def test_run_drops_duplicate_files(mock_encoder_worker, mocker):
+    """Повторно добавленный файл кодируется один раз."""
+    first = mock_encoder_worker.files_to_process[0]
+    mock_encoder_worker.files_to_process.append(Path(str(first)))
+    mocker.patch("src.encoding.encoder_worker.get_video_subtitle_attachment_info",
+                 return_value=(None,) * 8 + ("error",))
+    mocker.patch.object(mock_encoder_worker, "process_next_file")
+
+    mock_encoder_worker.run()
+
+    assert mock_encoder_worker.files_to_process.count(first) == 1
+
+def test_queue_duration_prescanned_in_parallel(mock_encoder_worker, mocker):
+    """Длительности файлов очереди запрашиваются параллельно и суммируются."""
+    import threading
+    threads = set()
+
+    def fake_info(path):
+        threads.add(threading.current_thread().name)
+        if path.suffix == ".mkv":
+            return (None,) * 8 + ("error",)
+        return (100.0, "h264", "yuv420p", 1920, 1080, None, [], [], None)
+
+    mocker.patch("src.encoding.encoder_worker.get_video_subtitle_attachment_info",
+                 side_effect=fake_info)
+    mocker.patch.object(mock_encoder_worker, "process_next_file")
+
+    mock_encoder_worker.run()
+
+    assert mock_encoder_worker.total_duration == 100.0
+    assert all(name.startswith("EncoderPrescan") for name in threads)
+
+def test_next_file_prefetched_while_encoding(mock_encoder_worker, mocker):
+    """После запуска ffmpeg следующий файл анализируется в фоне и не пробится повторно."""
+    m_get_info = mocker.patch("src.encoding.encoder_worker.get_video_subtitle_attachment_info")
+    m_get_info.return_value = (100.0, "h264", "yuv420p", 1920, 1080, None, [], [], None)
+    m_build_cmd = mocker.patch("src.encoding.encoder_worker.build_ffmpeg_command")
+    m_build_cmd.return_value = (["ffmpeg"], "dec", "enc")
+    mocker.patch("src.encoding.encoder_worker.QProcess.start")
+
+    mock_encoder_worker.process_next_file()
+    future = mock_encoder_worker._prefetched[1]
+    future.result(timeout=5)
+    assert m_get_info.call_count == 2
+
+    mock_encoder_worker.max_parallel_jobs = 2
+    mock_encoder_worker.process_next_file()
+    assert 1 in mock_encoder_worker._jobs
+    assert 1 not in mock_encoder_worker._prefetched
+    assert m_get_info.call_count == 2
+    mock_encoder_worker.finish_all_processing()
+
+def test_crop_detected_in_background_without_prefetch(mock_encoder_worker, mocker):
+    """Без предзагрузки cropdetect идет в фоне, параллельно с подготовкой файла."""
+    import threading
+    mocker.patch("src.encoding.encoder_worker.get_video_subtitle_attachment_info",
+                 return_value=(100.0, "h264", "yuv420p", 1920, 1080, None, [], [], None))
+    threads = []
+
+    def fake_crop(*args, **kwargs):
+        threads.append(threading.current_thread().name)
+        return "1920:800:0:140"
+
+    mocker.patch("src.encoding.encoder_worker.get_crop_parameters", side_effect=fake_crop)
+    mock_encoder_worker.auto_crop_enabled = True
+
+    file_info, crop_future = mock_encoder_worker._get_file_analysis(
+        0, mock_encoder_worker.files_to_process[0]
+    )
+    assert file_info[3:5] == (1920, 1080)
+    assert crop_future.result(timeout=5) == ("1920:800:0:140", [])
+    assert threads[0].startswith("EncoderAnalysis")
+    mock_encoder_worker.finish_all_processing()
+
+def test_scale_after_crop_keeps_aspect_and_even_size(mock_encoder_worker, mocker):
+    """После кропа ширина считается по пропорциям кадра и остается четной."""
+    mocker.patch("src.encoding.encoder_worker.get_video_subtitle_attachment_info",
+                 return_value=(100.0, "h264", "yuv420p", 1920, 1080, None, [], [], None))
+    mocker.patch("src.encoding.encoder_worker.get_crop_parameters",
+                 return_value="1920:804:0:138")
+    m_build_cmd = mocker.patch("src.encoding.encoder_worker.build_ffmpeg_command")
+    m_build_cmd.return_value = (["ffmpeg"], "dec", "enc")
+    mocker.patch("src.encoding.encoder_worker.QProcess.start")
+    mock_encoder_worker.auto_crop_enabled = True
+    mock_encoder_worker.force_resolution = True
+    mock_encoder_worker.selected_target_width = 1280
+    mock_encoder_worker.selected_target_height = 720
+
+    mock_encoder_worker.process_next_file()
+
+    scale_w, scale_h, crop = m_build_cmd.call_args[0][8:11]
+    assert (scale_w, scale_h) == (1718, 720)
+    assert crop == "1920:804:0:138"
+    mock_encoder_worker.finish_all_processing()
+
+def test_plan_scale_target_is_cached_per_geometry():
+    """Расчет масштабирования кэшируется по размерам кадра."""
+    from src.encoding.encoder_worker import plan_scale_target
+    plan_scale_target.cache_clear()
+
+    assert plan_scale_target(1280, 720) == (1280, 720)
+    assert plan_scale_target(1280, 720, 1920, 804) == (1718, 720)
+    assert plan_scale_target(1280, 720, 1920, 804) == (1718, 720)
+    assert plan_scale_target.cache_info().hits == 1
+
+def test_failed_job_removes_partial_output(mock_encoder_worker, mocker, tmp_path):
+    """Неполный файл удаляется при ошибке, отсутствующий файл не мешает завершению."""
+    from PyQt6.QtCore import QProcess
+    m_get_info = mocker.patch("src.encoding.encoder_worker.get_video_subtitle_attachment_info")
+    m_get_info.return_value = (100.0, "h264", "yuv420p", 1920, 1080, None, [], [], None)
+    m_build_cmd = mocker.patch("src.encoding.encoder_worker.build_ffmpeg_command")
+    m_build_cmd.return_value = (["ffmpeg"], "dec", "enc")
+    mocker.patch("src.encoding.encoder_worker.QProcess.start")
+    mock_encoder_worker.max_parallel_jobs = 2
+
+    mock_encoder_worker.process_next_file()
+    first, second = mock_encoder_worker._jobs[0], mock_encoder_worker._jobs[1]
+    first.encode_output = tmp_path / "partial.mp4"
+    first.encode_output.write_bytes(b"partial")
+    second.encode_output = tmp_path / "missing.mp4"
+
+    mock_encoder_worker.on_process_finished(first, 1, QProcess.ExitStatus.NormalExit)
+    mock_encoder_worker.on_process_finished(second, 1, QProcess.ExitStatus.NormalExit)
+
+    assert not first.encode_output.exists()
+    assert not mock_encoder_worker._jobs
+
+def test_staged_output_moved_to_destination(mock_encoder_worker, tmp_path):
+    """Файл, закодированный во временную папку, перемещается в папку вывода."""
+    from src.encoding.encoder_worker import EncodeJob
+    job = EncodeJob(0, tmp_path / "test1.mp4")
+    job.output_file = tmp_path / "out" / "test1.mp4"
+    job.output_file.parent.mkdir()
+    job.output_file.write_bytes(b"old")
+    job.encode_output = tmp_path / "staged.mp4"
+    job.encode_output.write_bytes(b"new")
+
+    assert mock_encoder_worker._move_encoded_output(job)
+    assert job.output_file.read_bytes() == b"new"
+    assert not job.encode_output.exists()
@@ -1,4 +1,5 @@
 import pytest
+import sys
 from pathlib import Path
 from PyQt6.QtCore import QObject, pyqtSignal
 import time
@@ -7,7 +8,7 @@ from src.encoding.encoder_worker import EncoderWorker
 class MockMainWindow(QObject):
     def prompt_for_subtitle_selection(self, tracks, filename):
         # Мокаем выбор субтитров, по умолчанию выбираем первый трек
-        return tracks[0] if tracks else None
+        return {'track': tracks[0] if tracks else None, 'apply_to_all': False}
 
 @pytest.fixture
 def mock_hw_info():
@@ -42,6 +43,7 @@ def encoder_worker(tmp_path, mock_hw_info):
         disable_subtitles=False,
         use_source_path=False,
         remove_credit_lines=False,
+        overwrite_existing=False,
         audio_settings={
             'codec': 'aac',
             'bitrate': '192k',
@@ -53,6 +55,17 @@ def encoder_worker(tmp_path, mock_hw_info):
         parent_gui=MockMainWindow()
     )
 
+@pytest.fixture
+def running_job(encoder_worker, mocker):
+    """Запущенное задание кодирования файла очереди с мок-процессом"""
+    from src.encoding.encoder_worker import EncodeJob
+    job = EncodeJob(0, Path("test.mp4"))
+    job.duration = 100.0
+    job.start_time = time.time()
+    job.process = mocker.Mock()
+    encoder_worker._jobs[0] = job
+    return job
+
 def test_encoder_initialization(encoder_worker):
     """Проверяем корректность инициализации EncoderWorker"""
     assert encoder_worker._is_running == True
@@ -69,6 +82,21 @@ def test_encoder_stop(encoder_worker):
     encoder_worker.stop()
     assert encoder_worker._is_running == False
 
+def test_log_level_filters_messages(encoder_worker, mocker):
+    """Сообщения ниже заданного уровня не отправляются в GUI"""
+    slot = mocker.Mock()
+    encoder_worker.log_message.connect(slot)
+    encoder_worker._log_min = 1  # info
+
+    encoder_worker._log("отладка", "debug")
+    encoder_worker._log("готово", "success")
+    encoder_worker._log("ошибка", "error")
+
+    assert not encoder_worker._debug_enabled()
+    assert [c.args for c in slot.call_args_list] == [
+        ("готово", "success"), ("ошибка", "error")
+    ]
+
 def test_format_time(encoder_worker):
     """Проверяем форматирование времени"""
     assert encoder_worker.format_time(3661) == "01:01:01"
@@ -98,4 +126,335 @@ def test_analyze_ffmpeg_stderr(encoder_worker, stderr_text, expected_substring):
     """Проверяем анализ ошибок FFmpeg"""
     result = encoder_worker.analyze_ffmpeg_stderr(stderr_text)
     assert isinstance(result, str)
-    assert expected_substring in result
\ No newline at end of file
+    assert expected_substring in result
+
+def test_split_chunk_lines_keeps_partial_line():
+    """Строка, разорванная между блоками вывода, собирается целиком"""
+    from src.encoding.encoder_worker import split_chunk_lines
+
+    lines, pending = split_chunk_lines("", "first line\nout_time_us=10")
+    assert lines == ["first line"]
+    assert pending == "out_time_us=10"
+
+    lines, pending = split_chunk_lines(pending, "00000\nprogress=continue\n")
+    assert lines == ["out_time_us=1000000", "progress=continue"]
+    assert pending == ""
+
+def test_stderr_kept_as_bytes_until_decoded(encoder_worker, running_job):
+    """Многобайтовый символ, разрезанный между блоками stderr, не теряется"""
+    from src.encoding.encoder_worker import decode_stderr_lines
+    job = running_job
+    data = "/видео/серия.mkv: No such file or directory\n".encode()
+    for chunk in (data[:4], data[4:]):
+        job.process.readAllStandardError.return_value.data.return_value = chunk
+        encoder_worker.read_stderr(job)
+
+    assert list(job.stderr_log) == [data.rstrip()]
+    assert decode_stderr_lines(job.error_lines.values()) == [data.decode().rstrip()]
+
+def test_read_progress_emits_on_block_end(qapp, encoder_worker, running_job, mocker):
+    """Прогресс обновляется по завершении блока -progress"""
+    job = running_job
+    job.duration = 60.0
+    progress_slot = mocker.Mock()
+    encoder_worker.progress.connect(progress_slot)
+
+    job.process.readAllStandardOutput.return_value.data.return_value = (
+        b"fps=181.00\nbitrate= 838.0kbits/s\nout_time_us=30020000\n"
+    )
+    encoder_worker.read_progress(job)
+    progress_slot.assert_not_called()
+
+    job.process.readAllStandardOutput.return_value.data.return_value = (
+        b"speed=6.01x\nprogress=continue\n"
+    )
+    encoder_worker.read_progress(job)
+    # В GUI прогресс уходит по таймеру, не чаще раза в интервал
+    assert encoder_worker._progress_timer.isActive()
+    encoder_worker._flush_progress()
+    progress_slot.assert_called_once()
+    percent, status = progress_slot.call_args[0]
+    assert percent == 50
+    assert "6.01x" in status and "838.0kbits/s" in status
+    assert job.progress_fields == {}
+
+def test_progress_updates_coalesced(qapp, encoder_worker, running_job, mocker):
+    """Из нескольких блоков -progress за интервал в GUI уходит только последний"""
+    job = running_job
+    progress_slot = mocker.Mock()
+    encoder_worker.progress.connect(progress_slot)
+    elapsed = mocker.spy(encoder_worker, "calculate_real_elapsed")
+
+    for out_time in (10, 20, 30):
+        job.process.readAllStandardOutput.return_value.data.return_value = (
+            f"out_time_us={out_time}000000\nprogress=continue\n".encode()
+        )
+        encoder_worker.read_progress(job)
+    encoder_worker._flush_progress()
+    encoder_worker._flush_progress()
+
+    progress_slot.assert_called_once()
+    assert progress_slot.call_args[0][0] == 30
+    # Строка статуса форматируется один раз, при отправке
+    assert elapsed.call_count == 1
+    assert not encoder_worker._progress_timer.isActive()
+
+def test_only_last_progress_block_parsed(qapp, encoder_worker, running_job, mocker):
+    """Из нескольких блоков -progress в одном чтении разбирается только последний"""
+    from src.encoding import encoder_worker as worker_module
+    job = running_job
+    parse = mocker.patch.object(
+        worker_module, "parse_ffmpeg_progress_block",
+        wraps=worker_module.parse_ffmpeg_progress_block
+    )
+
+    job.process.readAllStandardOutput.return_value.data.return_value = (
+        b"out_time_us=10000000\nprogress=continue\n"
+        b"out_time_us=20000000\nprogress=continue\n"
+        b"out_time_us=30000000\nprogress=continue\nout_time_us=4"
+    )
+    encoder_worker.read_progress(job)
+
+    parse.assert_called_once()
+    assert job.percent == 30
+    assert job.progress_partial == "out_time_us=4"
+
+def test_job_speed_from_progress_block(qapp, encoder_worker, running_job):
+    """Скорость задания берется из блока, при N/A считается нулевой"""
+    job = running_job
+
+    encoder_worker._update_job_progress(job, {'out_time_us': '1000000', 'speed': '2.5x'})
+    assert job.speed == 2.5
+    encoder_worker._update_job_progress(job, {'out_time_us': '2000000', 'speed': 'N/A'})
+    assert job.speed == 0.0
+
+def test_file_progress_emitted_on_percent_change(qapp, encoder_worker, running_job, mocker):
+    """Прогресс в списке файлов отправляется только при смене процента"""
+    job = running_job
+    file_slot = mocker.Mock()
+    encoder_worker.file_progress.connect(file_slot)
+
+    for out_time_us in ('1000000', '1500000', '2000000'):
+        encoder_worker._update_job_progress(job, {'out_time_us': out_time_us})
+
+    assert [c.args[1] for c in file_slot.call_args_list] == [1, 2]
+
+def test_no_progress_after_stop(qapp, encoder_worker, running_job, mocker):
+    """После остановки отложенный и новый прогресс в GUI не отправляются"""
+    job = running_job
+    progress_slot = mocker.Mock()
+    encoder_worker.progress.connect(progress_slot)
+    file_slot = mocker.Mock()
+    encoder_worker.file_progress.connect(file_slot)
+    job.process.readAllStandardOutput.return_value.data.return_value = (
+        b"out_time_us=10000000\nprogress=continue\n"
+    )
+    encoder_worker.read_progress(job)
+    file_slot.reset_mock()
+
+    encoder_worker.stop()
+    encoder_worker.read_progress(job)
+    encoder_worker._flush_progress()
+
+    progress_slot.assert_not_called()
+    file_slot.assert_not_called()
+    assert not encoder_worker._progress_timer.isActive()
+
+def test_queue_eta_recalculated_once_per_interval(qapp, encoder_worker, running_job, mocker):
+    """Оценка времени очереди пересчитывается не чаще раза в секунду"""
+    job = running_job
+    encoder_worker.total_start_time = time.time()
+    encoder_worker.total_duration = 100.0
+    overall_slot = mocker.Mock()
+    encoder_worker.overall_progress.connect(overall_slot)
+
+    for out_time in (10, 20):
+        job.process.readAllStandardOutput.return_value.data.return_value = (
+            f"out_time_us={out_time}000000\nspeed=2.0x\nprogress=continue\n".encode()
+        )
+        encoder_worker.read_progress(job)
+        encoder_worker._flush_progress()
+
+    overall_slot.assert_called_once()
+    assert overall_slot.call_args[0][:2] == (1, 1)
+
+def test_analyze_ffmpeg_stderr_details(encoder_worker):
+    """Из stderr извлекаются требуемая версия драйвера и путь к файлу"""
+    driver_err = (
+        "[hevc_nvenc @ 0x1] Driver does not support the required nvenc API version. "
+        "Required: 13.0 Found: 12.1\n"
+        "[hevc_nvenc @ 0x1] The minimum required Nvidia driver for nvenc is 570.0 or newer"
+    )
+    assert "570.0" in encoder_worker.analyze_ffmpeg_stderr(driver_err)
+
+    missing = "[in#0 @ 0x1] Error opening input: /data/in.mkv: No such file or directory"
+    assert "/data/in.mkv" in encoder_worker.analyze_ffmpeg_stderr(missing)
+
+def test_analyze_ffmpeg_stderr_fallback_context(encoder_worker):
+    """Без известного шаблона возвращается последняя строка с ошибкой и контекст"""
+    stderr = "line one\nline two\nSomething FAILED badly\nframe=10 fps=5 speed=1x"
+    result = encoder_worker.analyze_ffmpeg_stderr(stderr)
+    assert result == "Обнаружена ошибка: line one | line two | Something FAILED badly"
+
+def test_analyze_ffmpeg_stderr_accepts_lines(encoder_worker):
+    """Хвост stderr можно передать строками, без склейки в текст"""
+    from collections import deque
+    tail = deque(["Input #0, matroska", "Permission denied"], maxlen=5)
+    assert "Отказано в доступе" in encoder_worker.analyze_ffmpeg_stderr(tail)
+    assert "пустой stderr" in encoder_worker.analyze_ffmpeg_stderr(deque())
+
+def test_known_error_survives_tail_overflow(encoder_worker, running_job):
+    """Известная ошибка распознается, даже если вытеснена из хвоста stderr"""
+    from src.encoding.encoder_worker import STDERR_TAIL_LINES, decode_stderr_lines
+    job = running_job
+    lines = ["[out#0] /out/test.mp4: Permission denied"]
+    lines += [f"[mp4 @ 0x1] warning {i}" for i in range(STDERR_TAIL_LINES)]
+    job.process.readAllStandardError.return_value.data.return_value = (
+        ("\n".join(lines) + "\n").encode()
+    )
+    encoder_worker.read_stderr(job)
+
+    assert not any(b"Permission denied" in line for line in job.stderr_log)
+    result = encoder_worker.analyze_ffmpeg_stderr(decode_stderr_lines(
+        [*job.error_lines.values(), *job.stderr_log]
+    ))
+    assert "/out/test.mp4" in result
+
+def test_analyze_ffmpeg_stderr_priority(encoder_worker):
+    """Причина выбирается по приоритету, а не по порядку появления в stderr"""
+    stderr = (
+        "[out#0/mp4] Error muxing a packet\n"
+        "Conversion failed!\n"
+        "[out#0/mp4] No space left on device"
+    )
+    assert encoder_worker.analyze_ffmpeg_stderr(stderr) == "Закончилось место на диске."
+
+def test_read_progress_joins_split_lines(encoder_worker, running_job):
+    """Строка -progress, разорванная между блоками stdout, разбирается целиком"""
+    job = running_job
+
+    for chunk in (b"out_time_us=250", b"00000\r\nspeed=2.00x\r\nprog", b"ress=continue\r\n"):
+        job.process.readAllStandardOutput.return_value.data.return_value = chunk
+        encoder_worker.read_progress(job)
+
+    assert job.percent == 25
+    assert job.speed == 2.0
+    assert job.progress_partial == ""
+
+@pytest.mark.skipif(sys.platform == "win32", reason="только POSIX")
+def test_process_started_in_own_session(encoder_worker):
+    """На POSIX ffmpeg запускается в отдельной сессии (для killpg)"""
+    from PyQt6.QtCore import QProcess
+    from src.encoding.encoder_worker import EncodeJob
+    process = encoder_worker._create_process(EncodeJob(0, Path("test.mp4")))
+    if not hasattr(process, 'unixProcessParameters'):
+        pytest.skip("Qt < 6.6")
+    flags = process.unixProcessParameters().flags.value
+    assert flags & QProcess.UnixProcessFlag.CreateNewSession.value
+
+@pytest.fixture
+def worker_thread(encoder_worker):
+    """Поток кодировщика, как в GUI; останавливается после теста"""
+    from PyQt6.QtCore import QThread
+    thread = QThread()
+    yield thread
+    thread.quit()
+    thread.wait(5000)
+
+def start_job_on_worker_thread(worker, thread, script):
+    """Запускает sh-скрипт как задание и переносит кодировщик в поток"""
+    from src.encoding.encoder_worker import EncodeJob
+    job = EncodeJob(0, Path("test.mp4"))
+    job.process = worker._create_process(job)
+    if not hasattr(job.process, 'unixProcessParameters'):
+        pytest.skip("Qt < 6.6")
+    worker._jobs[0] = job
+    worker.current_file_index = len(worker.files_to_process) - 1
+    job.process.start("sh", ["-c", script])
+    assert job.process.waitForStarted(5000)
+    # QProcess - дочерний объект кодировщика и переходит в поток вместе с ним
+    worker.moveToThread(thread)
+    thread.start()
+    return job
+
+def request_stop(worker):
+    """Остановка из GUI-потока - так же, как это делает MainWindow"""
+    from PyQt6.QtCore import QMetaObject, Qt
+    QMetaObject.invokeMethod(worker, "stop", Qt.ConnectionType.QueuedConnection)
+
+def test_stop_from_gui_thread_cancels_pending_progress(encoder_worker, worker_thread, qtbot, mocker):
+    """Остановка из GUI-потока гасит таймер прогресса в потоке кодировщика"""
+    from src.encoding.encoder_worker import EncodeJob
+    progress_slot = mocker.Mock()
+    encoder_worker.progress.connect(progress_slot)
+    encoder_worker._pending_progress = (
+        EncodeJob(0, Path("test.mp4")), 10, "1x", "24", "1000kbits/s", None
+    )
+    encoder_worker._progress_timer.setInterval(300)
+    encoder_worker._progress_timer.start()
+    encoder_worker.moveToThread(worker_thread)
+    worker_thread.start()
+
+    request_stop(encoder_worker)
+    qtbot.waitUntil(lambda: encoder_worker._was_stopped_manually, timeout=1000)
+    qtbot.wait(500)
+
+    progress_slot.assert_not_called()
+    assert not encoder_worker._progress_timer.isActive()
+
+@pytest.mark.skipif(sys.platform == "win32", reason="только POSIX")
+def test_stop_from_gui_thread_after_sigterm_exit(encoder_worker, worker_thread, qtbot, mocker):
+    """Процесс, завершившийся по SIGTERM, не добивается таймером после удаления"""
+    mocker.patch("src.encoding.encoder_worker.KILL_GRACE_MS", 100)
+    force_kill = mocker.spy(encoder_worker, "_force_kill_group")
+    start_job_on_worker_thread(encoder_worker, worker_thread, "sleep 30")
+
+    with qtbot.waitSignal(encoder_worker.finished, timeout=5000) as blocker:
+        request_stop(encoder_worker)
+    assert blocker.args == [True]
+    # Даем сработать таймеру SIGKILL, если бы он пережил QProcess
+    qtbot.wait(300)
+    force_kill.assert_not_called()
+    assert not encoder_worker._jobs
+
+@pytest.mark.skipif(sys.platform == "win32", reason="только POSIX")
+def test_stop_from_gui_thread_escalates_to_sigkill(encoder_worker, worker_thread, qtbot, mocker):
+    """Группа, игнорирующая SIGTERM, добивается SIGKILL после паузы"""
+    from PyQt6.QtCore import QProcess
+    mocker.patch("src.encoding.encoder_worker.KILL_GRACE_MS", 100)
+    force_kill = mocker.spy(encoder_worker, "_force_kill_group")
+    job = start_job_on_worker_thread(
+        encoder_worker, worker_thread, "trap '' TERM; sleep 30 & wait"
+    )
+    exit_statuses = []
+    job.process.finished.connect(
+        lambda code, status: exit_statuses.append(status)
+    )
+    qtbot.wait(200)
+
+    with qtbot.waitSignal(encoder_worker.finished, timeout=5000):
+        request_stop(encoder_worker)
+    force_kill.assert_called_once()
+    qtbot.waitUntil(lambda: bool(exit_statuses), timeout=1000)
+    assert exit_statuses == [QProcess.ExitStatus.CrashExit]
+
+def test_subtitle_choice_reused_for_same_tracks(encoder_worker, mocker):
+    """Выбор "для всех файлов" повторяется без диалога для того же набора дорожек"""
+    first = [{'index': 2, 'title': 'Full', 'language': 'rus'},
+             {'index': 3, 'title': 'Signs', 'language': 'eng'}]
+    second = [{'index': 4, 'title': 'Full', 'language': 'rus'},
+              {'index': 5, 'title': 'Signs', 'language': 'eng'}]
+    m_invoke = mocker.patch(
+        "src.encoding.encoder_worker.QMetaObject.invokeMethod",
+        return_value={'track': dict(first[1]), 'apply_to_all': True}
+    )
+
+    assert encoder_worker._choose_subtitle_track(first, "01.mkv") == first[1]
+    assert encoder_worker._choose_subtitle_track(second, "02.mkv") is second[1]
+    assert m_invoke.call_count == 1
+
+    other = [{'index': 2, 'title': 'Full', 'language': 'jpn'}]
+    m_invoke.return_value = {'track': None, 'apply_to_all': False}
+    assert encoder_worker._choose_subtitle_track(other, "03.mkv") is None
+    assert encoder_worker._choose_subtitle_track(other, "04.mkv") is None
+    assert m_invoke.call_count == 3
@@ -134,4 +134,40 @@ def test_build_command_audio_flac_no_bitrate(mock_ffmpeg_path_check, base_hw_inf
 
     assert "-c:a flac" in cmd_str
     assert "-b:a" not in cmd_str
-    assert "-ac 2" in cmd_str
\ No newline at end of file
+    assert "-ac 2" in cmd_str
+def test_build_command_buffers_muxer_writes(mock_ffmpeg_path_check, base_hw_info):
+    """Муксер пишет крупными блоками, выходной файл остается последним аргументом."""
+    enc_settings = {
+        'codec': 'libx265',
+        'preset': 'medium',
+        'crf': 23,
+        'audio_codec': 'copy'
+    }
+    command, _, _ = build_ffmpeg_command(
+        Path("input.mp4"), Path("output.mp4"), base_hw_info, "h264", "yuv420p", enc_settings
+    )
+    cmd_str = " ".join(command)
+    assert "-flush_packets 0" in cmd_str
+    assert "-max_muxing_queue_size 9999" in cmd_str
+    assert command[-1] == "output.mp4"
+
+def test_build_command_thread_limits(mock_ffmpeg_path_check, base_hw_info):
+    """Лимиты потоков: -threads только для программного декодера, до -i."""
+    enc_settings = {
+        'codec': 'libx265',
+        'preset': 'medium',
+        'crf': 23,
+        'audio_codec': 'copy',
+        'decode_threads': 4,
+        'filter_threads': 4
+    }
+    command, _, _ = build_ffmpeg_command(
+        Path("input.mkv"), Path("output.mp4"), base_hw_info, "hevc", "yuv420p", enc_settings
+    )
+    assert command[command.index('-filter_threads') + 1] == '4'
+    assert command.index('-threads') < command.index('-i')
+
+    command, _, _ = build_ffmpeg_command(
+        Path("input.mkv"), Path("output.mp4"), base_hw_info, "h264", "yuv420p", enc_settings
+    )
+    assert '-threads' not in command
@@ -1,6 +1,9 @@
 import pytest
 from pathlib import Path
 import subprocess
+import threading
+from unittest.mock import patch
+import src.ffmpeg.crop as crop_module
 from src.ffmpeg.crop import get_crop_parameters
 
 @pytest.fixture
@@ -128,4 +131,99 @@ def test_crop_detection_without_black_bars(video_without_black_bars, mock_logger
     )
     
     # Для видео без черных полос параметры обрезки не должны быть найдены
-    assert crop_params is None
\ No newline at end of file
+    assert crop_params is None
+def test_crop_hwaccel_falls_back_to_cpu(mock_logger):
+    """Если cropdetect на GPU завершился с ошибкой, анализ повторяется на CPU"""
+    calls = []
+    def fake_cropdetect(filepath, duration, limit_value, use_hwaccel, stop_event):
+        calls.append(use_hwaccel)
+        return ([], True) if use_hwaccel else (["1920:800:0:140"], False)
+
+    with patch.object(crop_module, "FFMPEG_PATH") as ffmpeg_path, \
+            patch.object(crop_module, "_run_cropdetect", side_effect=fake_cropdetect):
+        ffmpeg_path.is_file.return_value = True
+        result = get_crop_parameters(
+            Path("video.mkv"), mock_logger,
+            source_size=(1920, 1080), use_hwaccel=True
+        )
+
+    assert calls == [True, False]
+    assert result == "1920:800:0:140"
+
+def test_crop_hwaccel_without_error_not_repeated_on_cpu(mock_logger):
+    """Если GPU декодировал видео, но кроп не найден, повтора на CPU нет"""
+    calls = []
+    def fake_cropdetect(filepath, duration, limit_value, use_hwaccel, stop_event):
+        calls.append(use_hwaccel)
+        return [], False
+
+    with patch.object(crop_module, "FFMPEG_PATH") as ffmpeg_path, \
+            patch.object(crop_module, "_run_cropdetect", side_effect=fake_cropdetect):
+        ffmpeg_path.is_file.return_value = True
+        result = get_crop_parameters(
+            Path("video.mkv"), mock_logger,
+            source_size=(1920, 1080), use_hwaccel=True
+        )
+
+    assert calls == [True]
+    assert result is None
+
+def test_cropdetect_command_samples_frames_on_gpu():
+    """Сначала ключевые кадры; без результата - каждый N-й кадр, select до копирования с GPU"""
+    with patch.object(crop_module.subprocess, "Popen") as m_popen:
+        m_popen.return_value.returncode = 0
+        m_popen.return_value.communicate.side_effect = [
+            ("", ""), ("", "crop=1920:800:0:140\n")
+        ]
+        detections, failed = crop_module._run_cropdetect(Path("video.mkv"), 30, 24, True)
+
+    keyframes_cmd, sampled_cmd = (c[0][0] for c in m_popen.call_args_list)
+    assert keyframes_cmd[keyframes_cmd.index('-skip_frame') + 1] == 'nokey'
+    assert keyframes_cmd.index('-skip_frame') < keyframes_cmd.index('-i')
+    assert 'select=' not in keyframes_cmd[keyframes_cmd.index('-vf') + 1]
+
+    command = sampled_cmd
+    assert '-skip_frame' not in command
+    assert command[command.index('-hwaccel_output_format') + 1] == 'cuda'
+    video_filter = command[command.index('-vf') + 1]
+    assert video_filter.index('select=') < video_filter.index('hwdownload')
+    assert video_filter.endswith('cropdetect=limit=24:round=2:reset=0')
+    assert detections == ["1920:800:0:140"]
+    assert not failed
+
+def test_cropdetect_keyframes_result_used_directly():
+    """Если по ключевым кадрам кроп найден, повторный анализ не запускается"""
+    with patch.object(crop_module.subprocess, "Popen") as m_popen:
+        m_popen.return_value.communicate.return_value = ("", "crop=1920:800:0:140\n")
+        detections, _ = crop_module._run_cropdetect(Path("video.mkv"), 30, 24, False)
+
+    assert m_popen.call_count == 1
+    assert detections == ["1920:800:0:140"]
+
+def test_cropdetect_error_skips_sampled_pass():
+    """При ошибке ffmpeg второй проход не запускается: он упадет так же"""
+    with patch.object(crop_module.subprocess, "Popen") as m_popen:
+        m_popen.return_value.returncode = 1
+        m_popen.return_value.communicate.return_value = ("", "Error while decoding\n")
+        detections, failed = crop_module._run_cropdetect(Path("video.mkv"), 30, 24, True)
+
+    assert m_popen.call_count == 1
+    assert detections == []
+    assert failed
+
+def test_cropdetect_killed_on_stop_event():
+    """Установка stop_event завершает запущенный ffmpeg, не дожидаясь таймаута"""
+    stop_event = threading.Event()
+    stop_event.set()
+    with patch.object(crop_module.subprocess, "Popen") as m_popen:
+        m_popen.return_value.communicate.side_effect = [
+            subprocess.TimeoutExpired("ffmpeg", 0.2), ("", "")
+        ]
+        detections, failed = crop_module._run_cropdetect(
+            Path("video.mkv"), 30, 24, True, stop_event
+        )
+
+    m_popen.return_value.kill.assert_called_once()
+    assert m_popen.call_count == 1
+    assert detections is None
+    assert not failed
@@ -1,6 +1,11 @@
 import pytest
 from unittest.mock import patch, MagicMock
-from src.ffmpeg.detection import verify_nvidia_gpu_presence, detect_nvidia_hardware
+from src.ffmpeg.detection import (
+    verify_nvidia_gpu_presence, detect_nvidia_hardware, get_max_nvenc_sessions
+)
+from src.app_config import (
+    NVENC_DEFAULT_MAX_SESSIONS, NVENC_CONSUMER_MAX_SESSIONS, NVENC_PRO_MAX_SESSIONS
+)
 import subprocess
 
 def test_verify_nvidia_gpu_presence_success():
@@ -136,4 +141,23 @@ def test_detect_subtitle_filter_support(filters_output, expected_filter_support,
         
         hw_info, _ = detect_nvidia_hardware()
         assert hw_info is not None
-        assert hw_info['subtitles_filter'] is expected_filter_support
\ No newline at end of file
+        assert hw_info['subtitles_filter'] is expected_filter_support
+
+@pytest.mark.parametrize("gpu_name, expected", [
+    ("NVIDIA GeForce RTX 3080", NVENC_CONSUMER_MAX_SESSIONS),
+    ("NVIDIA GeForce GTX 1660 SUPER", NVENC_CONSUMER_MAX_SESSIONS),
+    ("Quadro RTX 5000", NVENC_PRO_MAX_SESSIONS),
+    ("NVIDIA RTX A4000", NVENC_PRO_MAX_SESSIONS),
+    ("Tesla T4", NVENC_PRO_MAX_SESSIONS),
+    ("NVIDIA RTX 4000 Ada Generation", NVENC_PRO_MAX_SESSIONS),
+    ("NVIDIA RTX 6000 Ada Generation", NVENC_PRO_MAX_SESSIONS),
+    ("NVIDIA L4", NVENC_PRO_MAX_SESSIONS),
+    ("NVIDIA L40S", NVENC_PRO_MAX_SESSIONS),
+    ("NVIDIA H100 80GB HBM3", NVENC_PRO_MAX_SESSIONS),
+    ("NVIDIA TITAN RTX", NVENC_CONSUMER_MAX_SESSIONS),
+    ("", NVENC_DEFAULT_MAX_SESSIONS),
+    (None, NVENC_DEFAULT_MAX_SESSIONS),
+])
+def test_get_max_nvenc_sessions(gpu_name, expected):
+    """Тест определения лимита сессий NVENC по названию GPU"""
+    assert get_max_nvenc_sessions(gpu_name) == expected
@@ -0,0 +1,110 @@
+from unittest.mock import Mock
+
+import src.ffmpeg.probe_cache as probe_cache
+from src.ffmpeg.probe_cache import (
+    clear_probe_cache, get_cached_crop, get_cached_video_info, save_probe_cache
+)
+
+INFO = (100.0, "h264", "yuv420p", 1920, 1080, None, [], [], None)
+
+
+def test_probe_cache_hit_and_persist(tmp_path):
+    """Повторный анализ неизмененного файла не запускает ffprobe, кэш сохраняется на диск"""
+    video = tmp_path / "video.mkv"
+    video.write_bytes(b"data")
+    probe = Mock(return_value=INFO)
+
+    assert get_cached_video_info(video, probe) == INFO
+    assert get_cached_video_info(video, probe) == INFO
+    assert probe.call_count == 1
+
+    save_probe_cache()
+    assert probe_cache.PROBE_CACHE_PATH.is_file()
+
+    # Новый процесс читает кэш с диска
+    probe_cache._cache = None
+    assert get_cached_video_info(video, probe) == INFO
+    assert probe.call_count == 1
+
+
+def test_probe_cache_invalidated_on_change(tmp_path):
+    """Измененный файл и ошибки анализа не берутся из кэша"""
+    video = tmp_path / "video.mkv"
+    video.write_bytes(b"data")
+    probe = Mock(return_value=INFO)
+    get_cached_video_info(video, probe)
+
+    video.write_bytes(b"longer data")
+    get_cached_video_info(video, probe)
+    assert probe.call_count == 2
+
+    failing = Mock(return_value=(None,) * 8 + ("ошибка",))
+    other = tmp_path / "broken.mkv"
+    other.write_bytes(b"x")
+    get_cached_video_info(other, failing)
+    get_cached_video_info(other, failing)
+    assert failing.call_count == 2
+
+
+def test_crop_cached_with_probe_entry(tmp_path):
+    """Найденный кроп хранится в записи ffprobe и сбрасывается при изменении файла"""
+    video = tmp_path / "video.mkv"
+    video.write_bytes(b"data")
+    get_cached_video_info(video, Mock(return_value=INFO))
+    detect = Mock(return_value="1920:800:0:140")
+
+    assert get_cached_crop(video, "30:24", detect) == "1920:800:0:140"
+    assert get_cached_crop(video, "30:24", detect) == "1920:800:0:140"
+    assert detect.call_count == 1
+    # Другие параметры анализа - отдельная запись
+    get_cached_crop(video, "10:24", detect)
+    assert detect.call_count == 2
+
+    # Отсутствие кропа (или ошибка) не кэшируется
+    none_detect = Mock(return_value=None)
+    get_cached_crop(video, "20:24", none_detect)
+    get_cached_crop(video, "20:24", none_detect)
+    assert none_detect.call_count == 2
+
+    video.write_bytes(b"longer data")
+    get_cached_crop(video, "30:24", detect)
+    assert detect.call_count == 3
+
+
+def test_clear_probe_cache(tmp_path):
+    video = tmp_path / "video.mkv"
+    video.write_bytes(b"data")
+    probe = Mock(return_value=INFO)
+    get_cached_video_info(video, probe)
+    save_probe_cache()
+
+    clear_probe_cache()
+    assert not probe_cache.PROBE_CACHE_PATH.exists()
+    get_cached_video_info(video, probe)
+    assert probe.call_count == 2
+
+
+def test_probe_cache_other_version_discarded(tmp_path):
+    """Кэш другой версии формата (или старый без версии) не используется"""
+    import json
+    video = tmp_path / "video.mkv"
+    video.write_bytes(b"data")
+    probe = Mock(return_value=INFO)
+    get_cached_video_info(video, probe)
+    save_probe_cache()
+    saved = json.loads(probe_cache.PROBE_CACHE_PATH.read_text(encoding='utf-8'))
+    assert saved['version'] == probe_cache.CACHE_VERSION
+
+    # Старый формат: записи без обертки с версией
+    probe_cache.PROBE_CACHE_PATH.write_text(
+        json.dumps(saved['entries']), encoding='utf-8'
+    )
+    probe_cache._cache = None
+    get_cached_video_info(video, probe)
+    assert probe.call_count == 2
+
+    saved['version'] = probe_cache.CACHE_VERSION - 1
+    probe_cache.PROBE_CACHE_PATH.write_text(json.dumps(saved), encoding='utf-8')
+    probe_cache._cache = None
+    get_cached_video_info(video, probe)
+    assert probe.call_count == 3
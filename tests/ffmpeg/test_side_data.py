@@ -0,0 +1,78 @@
+import subprocess
+from pathlib import Path
+from unittest.mock import patch
+
+import src.ffmpeg.side_data as side_data
+from src.ffmpeg.side_data import extract_fonts_and_subtitle
+
+
+def test_extract_fonts_and_subtitle_single_run(tmp_path):
+    """Шрифты и субтитры извлекаются одним вызовом ffmpeg"""
+    fonts_dir = tmp_path / "extracted_fonts"
+    fonts_dir.mkdir()
+    attachments = [
+        {'index': 5, 'filename': 'Arial.ttf'},
+        {'index': 6, 'filename': 'Comic.otf'},
+    ]
+    logs = []
+
+    def fake_run(command, **kwargs):
+        # Имитируем ffmpeg: создаем файлы по путям из команды
+        for i, arg in enumerate(command):
+            if arg.startswith('-dump_attachment:'):
+                Path(command[i + 1]).write_bytes(b"font")
+        Path(command[-1]).write_text("[Script Info]\n", encoding='utf-8')
+        return subprocess.CompletedProcess(command, 0, "", "")
+
+    with patch.object(side_data, "FFMPEG_PATH") as ffmpeg_path, \
+            patch.object(side_data.subprocess, "run", side_effect=fake_run) as m_run:
+        ffmpeg_path.is_file.return_value = True
+        count, subtitle_path = extract_fonts_and_subtitle(
+            Path("video.mkv"), attachments, fonts_dir,
+            {'index': 3, 'title': 'Надписи'}, tmp_path,
+            lambda msg, level="info": logs.append((msg, level))
+        )
+
+    assert m_run.call_count == 1
+    command = m_run.call_args[0][0]
+    assert '-dump_attachment:5' in command
+    assert '-dump_attachment:6' in command
+    # Субтитры выбираются по глобальному индексу потока
+    assert command[command.index('-map') + 1] == '0:3'
+    assert count == 2
+    assert subtitle_path is not None and Path(subtitle_path).is_file()
+
+
+def test_extract_fonts_and_subtitle_nothing_to_do(tmp_path):
+    """Без шрифтов и субтитров ffmpeg не запускается"""
+    with patch.object(side_data.subprocess, "run") as m_run:
+        result = extract_fonts_and_subtitle(
+            Path("video.mkv"), [], None, None, tmp_path, lambda *a: None
+        )
+    assert result == (0, None)
+    m_run.assert_not_called()
+
+
+def test_extract_subtitle_interrupted_run_discards_partial_file(tmp_path):
+    """Прерванный запуск не оставляет обрезанные субтитры; с субтитрами нет таймаута"""
+    logs = []
+    run_kwargs = {}
+
+    def fake_run(command, **kwargs):
+        run_kwargs.update(kwargs)
+        # ffmpeg успел записать часть файла до прерывания
+        Path(command[-1]).write_text("[Script Info]\n", encoding='utf-8')
+        raise subprocess.TimeoutExpired(command, 60)
+
+    with patch.object(side_data, "FFMPEG_PATH") as ffmpeg_path, \
+            patch.object(side_data.subprocess, "run", side_effect=fake_run):
+        ffmpeg_path.is_file.return_value = True
+        count, subtitle_path = extract_fonts_and_subtitle(
+            Path("video.mkv"), [], None, {'index': 3, 'title': 'Надписи'},
+            tmp_path, lambda msg, level="info": logs.append((msg, level))
+        )
+
+    assert run_kwargs['timeout'] is None
+    assert (count, subtitle_path) == (0, None)
+    assert not list(tmp_path.glob("*.ass"))
+    assert not any("успешно" in msg for msg, _ in logs)
@@ -1,4 +1,5 @@
 import pytest
+from pathlib import Path
 from PyQt6.QtCore import Qt
 from PyQt6.QtWidgets import QMessageBox, QApplication
 from src.ui.main_window import MainWindow
@@ -10,7 +11,9 @@ def test_window_initial_state(main_window, qapp):
     assert "Hardsub Encoder GUI" in main_window.windowTitle()
     assert main_window.files_to_process == []
     assert main_window.processed_files_count == 0
-    assert main_window.encoder_thread is None
+    # Поток кодирования общий и запускается вместе с окном
+    assert main_window.encoder_thread is not None
+    assert main_window.encoder_thread.isRunning()
     assert main_window.encoder_worker is None
 
 def test_controls_default_state(main_window, qtbot):
@@ -199,6 +202,23 @@ def test_auto_switch_to_cpu_on_gpu_failure(main_window, mocker):
     # Ensure UI updated for CPU mode
     assert not main_window.page_nvenc.isVisible() or main_window.page_cpu.isVisible()
 
+def test_parallel_jobs_not_capped_by_detected_sessions(main_window, mocker):
+    """Лимит сессий NVENC задает значение по умолчанию, но не максимум"""
+    mocker.patch(
+        'src.ui.main_window.detect_nvidia_hardware',
+        return_value=({
+            'type': 'nvidia', 'encoder': 'hevc_nvenc', 'decoder_map': {},
+            'subtitles_filter': True, 'max_nvenc_sessions': 2
+        }, "")
+    )
+    mocker.patch('src.ui.main_window.check_executable', return_value=(True, ""))
+    mocker.patch('src.ui.main_window.os.cpu_count', return_value=16)
+
+    main_window.check_system_components()
+
+    assert main_window.spin_parallel_jobs.value() == 2
+    assert main_window.spin_parallel_jobs.maximum() == 8
+
 def test_tooltips_presence(main_window):
     """
     Verify that key UI elements have tooltips set (not empty).
@@ -252,3 +272,40 @@ def test_completion_notification_sound_and_tray(main_window, mocker):
     mock_tray_show.assert_called_once()
     args, _ = mock_tray_show.call_args
     assert "Кодирование завершено" in args[0] # Title
+
+def test_close_stops_encoder_thread(main_window):
+    """Закрытие окна без активной сессии останавливает общий поток кодирования"""
+    thread = main_window.encoder_thread
+    main_window.close()
+    assert not thread.isRunning()
+
+def test_force_resolution_toggle(main_window):
+    """Флажок разрешения управляет списком и возвращает исходное разрешение"""
+    main_window.current_source_width = 1920
+    main_window.current_source_height = 1080
+    main_window.combo_resolution.addItem("1280x720", userData=(1280, 720))
+    main_window.combo_resolution.addItem("1920x1080 (исходное)", userData=(1920, 1080))
+    main_window.combo_resolution.setCurrentIndex(0)
+
+    main_window.chk_force_resolution.setChecked(True)
+    assert main_window.combo_resolution.isEnabled()
+    assert main_window.combo_resolution.currentIndex() == 0
+
+    main_window.chk_force_resolution.setChecked(False)
+    assert not main_window.combo_resolution.isEnabled()
+    assert main_window.combo_resolution.currentData() == (1920, 1080)
+
+def test_file_list_progress(main_window):
+    """Прогресс параллельных файлов показывается в списке и сбрасывается в конце"""
+    main_window.files_to_process = ["/videos/a.mkv", "/videos/b.mkv"]
+    main_window.list_widget_files.addItems(["a.mkv", "b.mkv"])
+    main_window._file_rows = {
+        str(Path(f)): row for row, f in enumerate(main_window.files_to_process)
+    }
+
+    main_window.update_file_list_progress(str(Path("/videos/b.mkv")), 42)
+    assert main_window.list_widget_files.item(1).text() == "b.mkv — 42%"
+    assert main_window.list_widget_files.item(0).text() == "a.mkv"
+
+    main_window.reset_file_list_progress()
+    assert main_window.list_widget_files.item(1).text() == "b.mkv"
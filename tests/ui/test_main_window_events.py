@@ -108,3 +108,24 @@ def test_check_dependencies_missing_ffmpeg(main_window, mocker):
     main_window.check_system_components()
     
     assert not main_window.btn_start_stop.isEnabled()
+
+def test_check_dependencies_message_levels(main_window, mocker):
+    """Строки отчета об оборудовании получают уровень по первому ключевому слову."""
+    m_detect = mocker.patch("src.ui.main_window.detect_nvidia_hardware")
+    m_detect.return_value = (
+        {'type': 'nvidia', 'encoder': 'hevc_nvenc', 'subtitles_filter': True},
+        "Энкодер 'hevc_nvenc' не найден в FFmpeg.\n"
+        "[Предупреждение] Аппаратные декодеры NVIDIA (cuvid/nvdec) не найдены в FFmpeg.\n"
+        "Критическая ОШИБКА драйвера\n"
+        "Энкодер FFmpeg 'hevc_nvenc' найден."
+    )
+    mocker.patch("src.ui.main_window.check_executable", return_value=(True, "Found"))
+    m_log = mocker.patch.object(main_window, "log_message")
+
+    main_window.check_system_components()
+
+    levels = {c.args[0]: c.args[1] for c in m_log.call_args_list}
+    assert levels["Энкодер 'hevc_nvenc' не найден в FFmpeg."] == "error"
+    assert levels["[Предупреждение] Аппаратные декодеры NVIDIA (cuvid/nvdec) не найдены в FFmpeg."] == "warning"
+    assert levels["Критическая ОШИБКА драйвера"] == "error"
+    assert levels["Энкодер FFmpeg 'hevc_nvenc' найден."] == "info"